@@ -1,9 +1,33 @@
 import streamlit as st
-import zipfile, os, shutil, base64, math
-from utils import slugify
-from github_utils import upload_file, list_files, delete_file
+import zipfile, os, shutil, math
+from utils import slugify, collect_files
+from metrics import render_metrics_panel
+from storage import get_storage
 from firestore_utils import db
-from settings import ADMIN_PASSWORD, BASE_URL
+from models import Game, LIST_FIELDS, GAME_FIELDS
+from search_index import SearchIndex
+from catalog_cache import CatalogCache
+from catalog import (GamePager, ensure_page_order, read_stats, game_stats, add_game, update_game, delete_games, add_category, find_game,
+                     update_games, get_games, search_games, SEARCH_LIMIT, PAGE_ORDER_FIELD)
+from settings import ADMIN_PASSWORD
+from google.cloud.firestore import SERVER_TIMESTAMP
+
+storage = get_storage()
+
+# Seconds fuzzy search may serve a catalog copy that misses other sessions' writes
+FUZZY_CACHE_TTL = 60
+
+@st.cache_resource
+def get_fuzzy_search():
+    """Games cache and search index for fuzzy search, one per server process"""
+    return CatalogCache(ttl=FUZZY_CACHE_TTL), SearchIndex()
+
+fuzzy_games, fuzzy_index = get_fuzzy_search()
+
+def fetch_games():
+    """Fetch games from Firestore as Game records, newest first"""
+    games = [Game.from_snapshot(d) for d in db.collection("games").select(GAME_FIELDS).stream()]
+    return sorted(games, key=lambda g: g.createdAt, reverse=True)
 
 # =====================================================
 # PAGE CONFIG
@@ -222,8 +246,11 @@ st.markdown("""
 categories_docs = list(db.collection("categories").stream())
 categories = {c.id: c.to_dict().get("name", "Unnamed") for c in categories_docs}
 
-all_games = list(db.collection("games").stream())
-published_count = sum(1 for g in all_games if g.to_dict().get("published", False))
+# Maintained counts (one read); aggregation queries until meta/stats has a baseline
+game_counts = read_stats(db)
+if game_counts is None:
+    game_counts = game_stats(db.collection("games"))
+    st.caption("ℹ️ Catalog counts not initialised, counting live. Run `python -m catalog repair` once to initialise them.")
 
 # Stats Dashboard
 col1, col2, col3, col4 = st.columns(4)
@@ -231,7 +258,7 @@ col1, col2, col3, col4 = st.columns(4)
 with col1:
     st.markdown(f"""
         <div class="stats-card">
-            <div class="stats-number">{len(all_games)}</div>
+            <div class="stats-number">{game_counts["total"]}</div>
             <div class="stats-label">Total Games</div>
         </div>
     """, unsafe_allow_html=True)
@@ -239,7 +266,7 @@ with col1:
 with col2:
     st.markdown(f"""
         <div class="stats-card" style="background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);">
-            <div class="stats-number">{published_count}</div>
+            <div class="stats-number">{game_counts["published"]}</div>
             <div class="stats-label">Published</div>
         </div>
     """, unsafe_allow_html=True)
@@ -247,7 +274,7 @@ with col2:
 with col3:
     st.markdown(f"""
         <div class="stats-card" style="background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);">
-            <div class="stats-number">{len(all_games) - published_count}</div>
+            <div class="stats-number">{game_counts["drafts"]}</div>
             <div class="stats-label">Drafts</div>
         </div>
     """, unsafe_allow_html=True)
@@ -270,12 +297,19 @@ with st.expander("📂 Manage Categories", expanded=False):
     new_cat = col1.text_input("New Category Name", placeholder="e.g., Puzzle, Action, Strategy")
     if col2.button("➕ Add", use_container_width=True):
         if new_cat.strip():
-            db.collection("categories").add({"name": new_cat.strip()})
+            add_category(db, new_cat.strip())
             st.success("✅ Category added successfully")
             st.rerun()
         else:
             st.warning("⚠️ Please enter a category name")
 
+    # Per-category counts come from meta/stats, one read for all categories
+    if game_counts.get("byCategory"):
+        st.caption(" · ".join(
+            f"{name}: {game_counts['byCategory'].get(cat_id, {}).get('total', 0)}"
+            for cat_id, name in sorted(categories.items(), key=lambda item: item[1])
+        ))
+
 # =====================================================
 # UPLOAD GAME
 # =====================================================
@@ -306,8 +340,8 @@ if upload_btn:
         st.error("❌ Title and ZIP file are required")
         st.stop()
 
-    titles = [d.to_dict().get("title", "").lower() for d in db.collection("games").stream()]
-    if title.lower() in titles:
+    # One keyed read of the title reservation; add_game re-checks atomically
+    if find_game(db, title) is not None:
         st.error("❌ A game with this title already exists")
         st.stop()
 
@@ -340,42 +374,30 @@ if upload_btn:
                 shutil.rmtree(tmp_dir)
                 shutil.move(temp_move, tmp_dir)
 
-            # Upload files to GitHub
+            # Upload all files to storage (a single commit on GitHub)
+            files = collect_files(tmp_dir)
             uploaded_files = []
             failed_files = []
             error_details = []
-            
-            for root, _, files in os.walk(tmp_dir):
-                for file in files:
-                    full = os.path.join(root, file)
-                    rel_path = os.path.relpath(full, tmp_dir).replace("\\", "/")
-                    github_path = f"{slug}/{rel_path}"
-                    
-                    try:
-                        with open(full, "rb") as f:
-                            file_content = base64.b64encode(f.read()).decode()
-                            file_size = os.path.getsize(full)
-                            
-                            st.write(f"📤 Uploading: {github_path} ({file_size:,} bytes)")
-                            
-                            result = upload_file(github_path, file_content)
-                            
-                            st.write(f"Result: {result}")
-                            
-                            if result.get("success"):
-                                uploaded_files.append(github_path)
-                                st.success(f"✅ {github_path}")
-                            else:
-                                failed_files.append(github_path)
-                                error_msg = result.get("message", "Unknown error")
-                                error_details.append(f"{github_path}: {error_msg}")
-                                st.error(f"❌ {github_path}: {error_msg}")
-                                
-                    except Exception as e:
-                        error_msg = f"{github_path}: {str(e)}"
-                        st.error(f"Exception uploading {github_path}: {str(e)}")
-                        failed_files.append(github_path)
-                        error_details.append(error_msg)
+
+            st.write(f"📤 Uploading {len(files)} file(s) to {slug}/")
+            file_progress = st.progress(0)
+
+            result = storage.put_many(
+                slug, files,
+                progress_callback=lambda done, total, path: file_progress.progress(
+                    done / total, text=f"{done}/{total}: {path}"
+                )
+            )
+
+            if result.get("success"):
+                uploaded_files = result["files"]
+                st.success(f"✅ {result.get('message')}")
+            else:
+                failed_files = result["files"]
+                error_msg = result.get("message", "Unknown error")
+                error_details.append(f"{slug}: {error_msg}")
+                st.error(f"❌ {slug}: {error_msg}")
 
             # Check if files were uploaded successfully
             if failed_files:
@@ -410,16 +432,18 @@ if upload_btn:
                 st.stop()
 
             # Add to database only after successful GitHub upload
-            url = f"{BASE_URL}/{slug}/index.html"
+            url = storage.url_for(slug)
 
-            db.collection("games").add({
+            add_game(db, {
                 "title": title,
                 "titleNormalized": title.lower(),
                 "slug": slug,
                 "categoryId": category_id,
                 "url": url,
-                "published": False
+                "published": False,
+                "createdAt": SERVER_TIMESTAMP
             })
+            fuzzy_games.invalidate("games")
 
             # Clean up temporary files
             shutil.rmtree(tmp_dir)
@@ -444,28 +468,45 @@ st.markdown('<div class="section-header">🎯 Manage Games</div>', unsafe_allow_
 
 col1, col2, col3 = st.columns([3, 1, 1])
 search = col1.text_input("🔍 Search", placeholder="Search by title or slug")
+fuzzy = col3.toggle("🪄 Fuzzy", help="Also match titles a typo or two away, e.g. 'filomino'")
 page_size = col2.selectbox("Items per page", [5, 10, 20, 50], index=1)
 
 if "page" not in st.session_state:
     st.session_state.page = 1
 
-docs = list(db.collection("games").stream())
-docs.sort(key=lambda d: d.id, reverse=True)
-
 if search:
-    docs = [
-        d for d in docs
-        if search.lower() in d.to_dict().get("title", "").lower()
-        or search.lower() in d.to_dict().get("slug", "").lower()
-    ]
+    if fuzzy:
+        # Typo tolerance needs every game: served from the shared cache, re-indexed only on reload
+        fuzzy_index.sync(fuzzy_games.get("games", fetch_games))
+        docs = fuzzy_index.search(search, fuzzy=True)
+    else:
+        # Word-prefix match on searchTokens, so only matching games are read
+        found, truncated = search_games(db, search, LIST_FIELDS + [PAGE_ORDER_FIELD])
+        docs = [Game.from_snapshot(d) for d in found]
+        docs.sort(key=lambda d: d.createdAt, reverse=True)
+        if truncated:
+            st.caption(f"Showing the first {SEARCH_LIMIT} matches, refine the search to narrow them down")
+
+    total = len(docs)
+    total_pages = max(1, math.ceil(total / page_size))
+
+    st.session_state.page = max(1, min(st.session_state.page, total_pages))
+    start = (st.session_state.page - 1) * page_size
+    end = start + page_size
+    page_docs = docs[start:end]
+else:
+    # Newest first, one page per read; the pager keeps this session's page boundaries
+    pager_key = f"pager_{page_size}"
+    total = game_counts["total"]
+    if pager_key not in st.session_state:
+        # Games stored before createdAt was written would be counted but never listed
+        ensure_page_order(db.collection("games"), total)
+        st.session_state[pager_key] = GamePager(db.collection("games"), page_size, fields=LIST_FIELDS)
 
-total = len(docs)
-total_pages = max(1, math.ceil(total / page_size))
+    total_pages = max(1, math.ceil(total / page_size))
 
-st.session_state.page = max(1, min(st.session_state.page, total_pages))
-start = (st.session_state.page - 1) * page_size
-end = start + page_size
-page_docs = docs[start:end]
+    st.session_state.page = max(1, min(st.session_state.page, total_pages))
+    page_docs = [Game.from_snapshot(d) for d in st.session_state[pager_key].page(st.session_state.page)]
 
 # =====================================================
 # PAGINATION CONTROLS
@@ -497,10 +538,9 @@ if total == 0:
     st.info("📭 No games found. Upload your first game to get started!")
 else:
     for g in page_docs:
-        data = g.to_dict()
-        slug = data.get("slug", slugify(data.get("title", "")))
-        cat = categories.get(data.get("categoryId"), "Uncategorized")
-        is_published = data.get("published", False)
+        slug = g.slug
+        cat = categories.get(g.categoryId, "Uncategorized")
+        is_published = g.published
 
         st.markdown('<div class="game-item">', unsafe_allow_html=True)
         
@@ -511,7 +551,7 @@ else:
             selected.add(g.id)
 
         with c2:
-            st.markdown(f"### 🎮 {data.get('title')}")
+            st.markdown(f"### 🎮 {g.title}")
             badge_class = "badge-published" if is_published else "badge-draft"
             status = "Published" if is_published else "Draft"
             st.markdown(
@@ -527,22 +567,61 @@ else:
             key=f"pub_{g.id}"
         )
         if pub != is_published:
-            db.collection("games").document(g.id).update({"published": pub})
+            update_game(db, g.id, {"published": pub})
+            fuzzy_games.invalidate("games")
             st.rerun()
 
         if c4.button("👁", key=f"prev_{g.id}", use_container_width=True, help="Preview game"):
-            st.components.v1.iframe(data["url"], height=600, scrolling=True)
+            st.components.v1.iframe(g.url, height=600, scrolling=True)
 
         if c5.button("🗑 Delete", key=f"del_{g.id}", use_container_width=True, type="secondary"):
-            files = list_files(slug)
-            for f in files:
-                delete_file(f["path"], f["sha"])
-            db.collection("games").document(g.id).delete()
-            st.success("✅ Game deleted successfully")
-            st.rerun()
+            result = storage.delete_many([slug])
+            if result.get("success"):
+                delete_games(db, [g.id])
+                fuzzy_games.invalidate("games")
+                st.success("✅ Game deleted successfully")
+                st.rerun()
+            else:
+                st.error(f"❌ Error deleting game files: {result.get('message')}")
 
         st.markdown('</div>', unsafe_allow_html=True)
 
+# =====================================================
+# BULK ACTIONS
+# =====================================================
+def bulk_update(changes, done_message):
+    """Apply the same changes to every selected game with batched writes"""
+    try:
+        update_games(db, selected, changes)
+        fuzzy_games.invalidate("games")
+        for game_id in selected:
+            # Row checkboxes would otherwise keep (and write back) the old state
+            st.session_state.pop(f"pub_{game_id}", None)
+            st.session_state.pop(f"sel_{game_id}", None)
+        st.success(done_message)
+        st.rerun()
+    except Exception as e:
+        st.error(f"❌ Error updating games: {str(e)}")
+
+if selected:
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown(f"**{len(selected)} game(s) selected**")
+    b1, b2, b3, b4 = st.columns([1, 1, 2, 1])
+    if b1.button("✅ Publish", use_container_width=True):
+        bulk_update({"published": True}, f"✅ {len(selected)} game(s) published")
+    if b2.button("🚫 Unpublish", use_container_width=True):
+        bulk_update({"published": False}, f"✅ {len(selected)} game(s) unpublished")
+    if categories:
+        target_category = b3.selectbox(
+            "Move to category",
+            list(categories.keys()),
+            format_func=lambda x: categories[x],
+            key="bulk_category",
+            label_visibility="collapsed"
+        )
+        if b4.button("📂 Move", use_container_width=True):
+            bulk_update({"categoryId": target_category}, f"✅ {len(selected)} game(s) moved to {categories[target_category]}")
+
 # =====================================================
 # BULK DELETE
 # =====================================================
@@ -552,19 +631,29 @@ if selected:
     with col2:
         if st.button(f"🧹 Delete {len(selected)} Selected Game(s)", use_container_width=True, type="primary"):
             with st.spinner("Deleting selected games..."):
-                for game_id in selected:
-                    doc = db.collection("games").document(game_id).get()
-                    data = doc.to_dict()
-                    slug = data.get("slug", slugify(data.get("title", "")))
-
-                    files = list_files(slug)
-                    for f in files:
-                        delete_file(f["path"], f["sha"])
-
-                    db.collection("games").document(game_id).delete()
+                # One round trip for every selected game
+                slugs = [
+                    Game.from_snapshot(doc).slug
+                    for doc in get_games(db, selected, ["slug", "title"])
+                ]
+
+                # One commit removes every selected game folder
+                result = storage.delete_many(slugs)
+                if result.get("success"):
+                    delete_games(db, selected)
+                    fuzzy_games.invalidate("games")
+
+            if result.get("success"):
+                st.success(f"✅ {len(selected)} game(s) deleted successfully")
+                st.rerun()
+            else:
+                st.error(f"❌ Error deleting game files: {result.get('message')}")
 
-            st.success(f"✅ {len(selected)} game(s) deleted successfully")
-            st.rerun()
+# =====================================================
+# REQUEST METRICS
+# =====================================================
+with st.expander("📈 Request Metrics", expanded=False):
+    render_metrics_panel()
 
 # =====================================================
 # FOOTER
@@ -0,0 +1,643 @@
+import re
+import sys
+from collections import Counter
+from urllib.parse import quote
+
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition
+from google.cloud.firestore import Increment, Query, SERVER_TIMESTAMP
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+# Field the Manage Games list is ordered by (newest first)
+PAGE_ORDER_FIELD = "createdAt"
+
+# Document holding the maintained catalog counts
+STATS_COLLECTION = "meta"
+STATS_DOCUMENT = "stats"
+
+# Written only by repair_stats: counts without it hold increments but no baseline
+STATS_BASELINE_FIELD = "repairedAt"
+
+# Times a write is re-read and retried when a game changed under it
+WRITE_RETRIES = 3
+
+# Fields read back by bulk updates and deletes to keep stats and titles in step
+COUNTED_FIELDS = ["published", "categoryId", "titleNormalized"]
+
+# Title reservations: titles/{key of titleNormalized} -> {"gameId": ...}
+TITLES_COLLECTION = "titles"
+
+# Values per "in" query when looking up titles that have no reservation yet
+IN_QUERY_LIMIT = 30
+
+# Word prefixes of title and slug that server-side search matches with array_contains
+SEARCH_TOKENS_FIELD = "searchTokens"
+
+# Longest prefix stored per word; longer query words are cut to this length
+MAX_TOKEN_LENGTH = 20
+
+# Most games a server-side search returns
+SEARCH_LIMIT = 200
+
+# Games per atomic batch (Firestore allows 500 writes: two per game plus the stats update)
+BATCH_SIZE = 200
+
+
+class DuplicateTitleError(Exception):
+    """Raised when a game title is already reserved by another game"""
+
+    def __init__(self, title):
+        self.title = title
+        super().__init__(f"Duplicate title '{title}' already exists")
+
+
+class GamePager:
+    """Server-side pagination of a collection with limit + start_after cursors
+
+    Remembers the last document of every page it has loaded, so Next and
+    Previous each read one page (page_size documents) however large the
+    collection is. Keep one pager per session and page size.
+
+    Usage:
+        pager = GamePager(db.collection("games"), page_size=10, fields=LIST_FIELDS)
+        docs = pager.page(3)
+    """
+
+    def __init__(self, collection, page_size, order_field=PAGE_ORDER_FIELD, fields=None):
+        self.collection = collection
+        self.page_size = page_size
+        self.order_field = order_field
+        # Projection for page reads; the ordering field is always needed for cursors
+        self.fields = fields + [order_field] if fields is not None else None
+        self.cursors = {1: None}  # page number -> snapshot the page starts after
+
+    def _query(self, cursor, fields=None):
+        query = self.collection.order_by(self.order_field, direction=Query.DESCENDING)
+        if fields is not None:
+            query = query.select(fields)
+        if cursor is not None:
+            query = query.start_after(cursor)
+        return query.limit(self.page_size)
+
+    def page(self, number):
+        """Return the documents on a page (1-based), [] past the end
+
+        Pages never visited before are reached by walking forward from
+        the nearest known cursor, reading only the ordering field.
+        """
+        start = max(n for n in self.cursors if n <= number)
+        for n in range(start, number):
+            skipped = list(self._query(self.cursors[n], [self.order_field]).stream())
+            if len(skipped) < self.page_size:
+                return []
+            self.cursors[n + 1] = skipped[-1]
+
+        docs = list(self._query(self.cursors[number], self.fields).stream())
+        # Later boundaries may have shifted if games were added or removed since
+        self.cursors = {n: cursor for n, cursor in self.cursors.items() if n <= number}
+        if docs:
+            self.cursors[number + 1] = docs[-1]
+        return docs
+
+    def reset(self):
+        """Forget page boundaries, e.g. after this session adds or deletes games"""
+        self.cursors = {1: None}
+
+
+def created_at(doc):
+    """Sort key for newest-first lists: createdAt, or the create time if missing"""
+    return (doc.to_dict() or {}).get(PAGE_ORDER_FIELD) or doc.create_time
+
+
+def count_documents(collection):
+    """Number of documents in a collection, from one aggregation query"""
+    return collection.count().get()[0][0].value
+
+
+def game_stats(collection):
+    """Dashboard counts from two aggregation queries, whatever the catalog size
+
+    The fallback when meta/stats can't be trusted; per-category counts are
+    only maintained there, so byCategory is empty.
+
+    Returns:
+        dict: {"total": int, "published": int, "drafts": int, "byCategory": {}}
+    """
+    total = count_documents(collection)
+    published = count_documents(collection.where(filter=FieldFilter("published", "==", True)))
+    return {"total": total, "published": published, "drafts": total - published, "byCategory": {}}
+
+
+# -------------------------------------------------
+# Title reservations (titles/{titleNormalized})
+# -------------------------------------------------
+def normalize_title(title):
+    return title.strip().lower()
+
+
+def _title_ref(db, title_normalized):
+    # Document ids can't contain "/" or be "." / ".." / "__x__", so percent-encode those too
+    key = quote(title_normalized, safe=" ").replace(".", "%2E").replace("_", "%5F")
+    return db.collection(TITLES_COLLECTION).document(key)
+
+
+def _reserve(db, title_normalized, game_id):
+    """Reserve a title found on an unreserved game, keeping any reservation made meanwhile"""
+    try:
+        _title_ref(db, title_normalized).create({"gameId": game_id, "titleNormalized": title_normalized})
+    except AlreadyExists:
+        pass
+
+
+def _unreserved_games(db, titles_normalized):
+    """Return {titleNormalized: game id} for games whose title has no reservation yet
+
+    Games added before reservations existed are only found by querying
+    titleNormalized; each one found is reserved so the next check is a
+    keyed read.
+    """
+    found = {}
+    titles_normalized = sorted(titles_normalized)
+    for i in range(0, len(titles_normalized), IN_QUERY_LIMIT):
+        query = db.collection("games").where(
+            filter=FieldFilter("titleNormalized", "in", titles_normalized[i:i + IN_QUERY_LIMIT])
+        ).select(["titleNormalized"])
+        for snapshot in query.stream():
+            title_normalized = snapshot.get("titleNormalized")
+            if title_normalized not in found:
+                found[title_normalized] = snapshot.id
+                _reserve(db, title_normalized, snapshot.id)
+    return found
+
+
+def _held_titles(db, reservations):
+    """Return {titleNormalized: game id} for reservations whose game still holds the title
+
+    Games deleted outside delete_games (e.g. from the Firebase console)
+    leave their reservation behind; those are deleted here, unless the
+    reservation changed meanwhile, so the title is free again.
+    """
+    reservations = [snapshot for snapshot in reservations if snapshot.exists]
+    if not reservations:
+        return {}
+    refs = [db.collection("games").document(snapshot.get("gameId")) for snapshot in reservations]
+    games = {game.id: game for game in db.get_all(refs, field_paths=["titleNormalized"])}
+
+    held = {}
+    for reservation in reservations:
+        title_normalized = reservation.get("titleNormalized")
+        game = games.get(reservation.get("gameId"))
+        if game is not None and game.exists and (game.to_dict() or {}).get("titleNormalized", title_normalized) == title_normalized:
+            held[title_normalized] = game.id
+            continue
+        print(f"Releasing stale title reservation: {title_normalized}")
+        try:
+            reservation.reference.delete(option=db.write_option(last_update_time=reservation.update_time))
+        except FailedPrecondition:
+            pass
+    return held
+
+
+def find_game(db, title):
+    """Return the id of the game holding a title, or None
+
+    Two keyed reads (the reservation and its game) once the title is
+    reserved; otherwise a titleNormalized query for games that predate
+    reservations.
+    """
+    title_normalized = normalize_title(title)
+    game_id = _held_titles(db, [_title_ref(db, title_normalized).get()]).get(title_normalized)
+    if game_id is not None:
+        return game_id
+    return _unreserved_games(db, [title_normalized]).get(title_normalized)
+
+
+def taken_titles(db, titles):
+    """Return the normalized titles among titles that are already taken
+
+    One round trip for the reservations and one for their games, plus
+    batched titleNormalized queries for titles that have none.
+    """
+    refs = [_title_ref(db, normalize_title(title)) for title in titles]
+    if not refs:
+        return set()
+    reserved = set(_held_titles(db, db.get_all(refs)))
+    unreserved = {normalize_title(title) for title in titles} - reserved
+    return reserved | set(_unreserved_games(db, unreserved))
+
+
+def reserve_titles(db):
+    """Create missing title reservations for games added before they existed
+
+    Returns:
+        tuple: (number reserved, list of titles held by more than one game)
+    """
+    reserved, clashes = 0, []
+    for snapshot in db.collection("games").select(["title", "titleNormalized"]).stream():
+        data = snapshot.to_dict()
+        title_normalized = data.get("titleNormalized") or normalize_title(data.get("title", ""))
+        try:
+            _title_ref(db, title_normalized).create({"gameId": snapshot.id, "titleNormalized": title_normalized})
+            reserved += 1
+        except AlreadyExists:
+            if find_game(db, title_normalized) != snapshot.id:
+                clashes.append(data.get("title", title_normalized))
+    return reserved, clashes
+
+
+# -------------------------------------------------
+# Search tokens (searchTokens)
+# -------------------------------------------------
+def search_words(text):
+    return [word for word in re.split(r"[^0-9a-z]+", normalize_title(text)) if word]
+
+
+def search_tokens(title, slug):
+    """Return every prefix of every title and slug word, for array_contains search"""
+    tokens = set()
+    for word in search_words(title) + search_words(slug):
+        for end in range(1, min(len(word), MAX_TOKEN_LENGTH) + 1):
+            tokens.add(word[:end])
+    return sorted(tokens)
+
+
+def search_games(db, query, fields=None, limit=SEARCH_LIMIT):
+    """Find games where every query word starts a title or slug word
+
+    Only games holding the longest query word are read. Firestore allows
+    one array_contains per query, so the other words are checked on what
+    comes back, page after page, until limit matches are found or the
+    query runs out.
+
+    Returns:
+        tuple: (list of DocumentSnapshots, True if more than limit games match)
+    """
+    words = [word[:MAX_TOKEN_LENGTH] for word in search_words(query)]
+    if not words:
+        return [], False
+    query_ref = db.collection("games").where(
+        filter=FieldFilter(SEARCH_TOKENS_FIELD, "array_contains", max(words, key=len))
+    )
+    if fields is not None:
+        query_ref = query_ref.select(fields)
+
+    matches = []
+    cursor = None
+    while len(matches) <= limit:
+        page_ref = query_ref.start_after(cursor) if cursor is not None else query_ref
+        page = list(page_ref.limit(limit).stream())
+        for snapshot in page:
+            data = snapshot.to_dict() or {}
+            game_words = search_words(data.get("title", "")) + search_words(data.get("slug", ""))
+            if all(any(game_word.startswith(word) for game_word in game_words) for word in words):
+                matches.append(snapshot)
+        if len(page) < limit:
+            break
+        cursor = page[-1]
+    return matches[:limit], len(matches) > limit
+
+
+def backfill_search_tokens(db):
+    """Write searchTokens on games added before it existed or whose tokens are stale
+
+    Returns:
+        int: Number of games updated
+    """
+    updated = 0
+    batch, pending = db.batch(), 0
+    for snapshot in db.collection("games").select(["title", "slug", SEARCH_TOKENS_FIELD]).stream():
+        data = snapshot.to_dict()
+        tokens = search_tokens(data.get("title", ""), data.get("slug", ""))
+        if data.get(SEARCH_TOKENS_FIELD) == tokens:
+            continue
+        batch.update(snapshot.reference, {SEARCH_TOKENS_FIELD: tokens})
+        pending += 1
+        if pending == BATCH_SIZE:
+            batch.commit()
+            updated += pending
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+        updated += pending
+    return updated
+
+
+# -------------------------------------------------
+# Maintained stats (meta/stats)
+# -------------------------------------------------
+def _stats_ref(db):
+    return db.collection(STATS_COLLECTION).document(STATS_DOCUMENT)
+
+
+def _count_game(counts, data, sign):
+    """Add (sign=1) or remove (sign=-1) one game's contribution to counts"""
+    published = sign if data.get("published", False) else 0
+    category = data.get("categoryId") or "none"
+    counts[("total",)] += sign
+    counts[("published",)] += published
+    counts[("byCategory", category, "total")] += sign
+    counts[("byCategory", category, "published")] += published
+
+
+def _stats_update(counts):
+    """Turn path -> delta counts into a merge-set payload of Increments"""
+    payload = {"updatedAt": SERVER_TIMESTAMP}
+    for path, delta in counts.items():
+        if delta:
+            node = payload
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = Increment(delta)
+    return payload
+
+
+def _commit(db, build):
+    """Commit build(batch) atomically, rebuilding it if a game changed meanwhile
+
+    build reads what it needs and adds writes guarded by
+    last_update_time preconditions, so a read-modify-write is applied
+    only if nothing changed in between, like a transaction.
+
+    Returns:
+        Commit time (DatetimeWithNanoseconds) or None if build wrote nothing
+    """
+    for attempt in range(WRITE_RETRIES + 1):
+        batch = db.batch()
+        if build(batch) is False:
+            return None
+        try:
+            batch.commit()
+            return batch.commit_time
+        except FailedPrecondition:
+            if attempt == WRITE_RETRIES:
+                raise
+            print(f"Game changed during write, retry {attempt + 1}/{WRITE_RETRIES}")
+
+
+def add_game(db, data):
+    """Add a game, reserve its title and count it in meta/stats in one atomic write
+
+    The reservation is created with an exists=false precondition, so of
+    two sessions adding the same title at once exactly one succeeds.
+
+    Returns:
+        tuple: (commit time, DocumentReference)
+
+    Raises:
+        DuplicateTitleError: If the title is already taken
+    """
+    ref = db.collection("games").document()
+    title_normalized = normalize_title(data["title"])
+    counts = Counter()
+    _count_game(counts, data, 1)
+
+    def build(batch):
+        batch.create(ref, {
+            **data,
+            "titleNormalized": title_normalized,
+            SEARCH_TOKENS_FIELD: search_tokens(data["title"], data.get("slug", "")),
+            PAGE_ORDER_FIELD: data.get(PAGE_ORDER_FIELD, SERVER_TIMESTAMP)
+        })
+        batch.create(_title_ref(db, title_normalized), {"gameId": ref.id, "titleNormalized": title_normalized})
+        batch.set(_stats_ref(db), _stats_update(counts), merge=True)
+
+    try:
+        return _commit(db, build), ref
+    except AlreadyExists:
+        raise DuplicateTitleError(data["title"])
+
+
+def get_games(db, game_ids, fields=None):
+    """Read many games in one round trip, skipping ids that don't exist
+
+    Args:
+        game_ids: Document ids
+        fields: Optional projection, e.g. ["slug", "title"]
+
+    Returns:
+        list: DocumentSnapshots
+    """
+    refs = [db.collection("games").document(game_id) for game_id in game_ids]
+    if not refs:
+        return []
+    return [snapshot for snapshot in db.get_all(refs, field_paths=fields) if snapshot.exists]
+
+
+def update_games(db, game_ids, changes):
+    """Apply the same field changes to games, keeping meta/stats in step
+
+    Used for bulk publish, unpublish and recategorize: each batch of
+    BATCH_SIZE games costs one get_all and one commit.
+
+    Returns:
+        Commit time of the last batch, or None if no game exists
+    """
+    refs = [db.collection("games").document(game_id) for game_id in game_ids]
+    commit_time = None
+    # A rename also rewrites the search tokens, which need both title and slug
+    retokenize = "title" in changes or "slug" in changes
+    fields = COUNTED_FIELDS + (["title", "slug"] if retokenize else [])
+
+    for i in range(0, len(refs), BATCH_SIZE):
+        chunk = refs[i:i + BATCH_SIZE]
+
+        def build(batch):
+            counts = Counter()
+            found = False
+            for snapshot in db.get_all(chunk, field_paths=fields):
+                if not snapshot.exists:
+                    continue
+                found = True
+                old = snapshot.to_dict()
+                new = {**old, **changes}
+                _count_game(counts, old, -1)
+                _count_game(counts, new, 1)
+                update = changes
+                if retokenize:
+                    update = {**changes, SEARCH_TOKENS_FIELD: search_tokens(new.get("title", ""), new.get("slug", ""))}
+                batch.update(snapshot.reference, update,
+                             option=db.write_option(last_update_time=snapshot.update_time))
+
+                # Renamed: move the title reservation with the game
+                old_title = old.get("titleNormalized")
+                new_title = changes.get("titleNormalized", old_title)
+                if new_title != old_title:
+                    batch.create(_title_ref(db, new_title), {"gameId": snapshot.id, "titleNormalized": new_title})
+                    if old_title:
+                        batch.delete(_title_ref(db, old_title))
+            if not found:
+                return False
+            batch.set(_stats_ref(db), _stats_update(counts), merge=True)
+
+        try:
+            commit_time = _commit(db, build) or commit_time
+        except AlreadyExists:
+            raise DuplicateTitleError(changes.get("title", changes.get("titleNormalized")))
+    return commit_time
+
+
+def update_game(db, game_id, changes):
+    """Update one game, keeping meta/stats in step. Returns the commit time"""
+    return update_games(db, [game_id], changes)
+
+
+def delete_games(db, game_ids):
+    """Delete games and uncount them from meta/stats
+
+    Each batch of BATCH_SIZE games is deleted atomically together with
+    its stats update.
+
+    Returns:
+        Commit time of the last batch, or None if no game exists
+    """
+    refs = [db.collection("games").document(game_id) for game_id in game_ids]
+    commit_time = None
+
+    for i in range(0, len(refs), BATCH_SIZE):
+        chunk = refs[i:i + BATCH_SIZE]
+
+        def build(batch):
+            counts = Counter()
+            found = False
+            for snapshot in db.get_all(chunk, field_paths=COUNTED_FIELDS):
+                if not snapshot.exists:
+                    continue
+                found = True
+                data = snapshot.to_dict()
+                _count_game(counts, data, -1)
+                batch.delete(snapshot.reference,
+                             option=db.write_option(last_update_time=snapshot.update_time))
+                if data.get("titleNormalized"):
+                    batch.delete(_title_ref(db, data["titleNormalized"]))
+            if not found:
+                return False
+            batch.set(_stats_ref(db), _stats_update(counts), merge=True)
+
+        commit_time = _commit(db, build) or commit_time
+    return commit_time
+
+
+def add_category(db, name):
+    """Add a category and count it in meta/stats in one atomic write
+
+    Returns:
+        tuple: (commit time, DocumentReference)
+    """
+    ref = db.collection("categories").document()
+
+    def build(batch):
+        batch.create(ref, {"name": name})
+        batch.set(_stats_ref(db), {"categories": Increment(1), "updatedAt": SERVER_TIMESTAMP}, merge=True)
+
+    return _commit(db, build), ref
+
+
+def read_stats(db):
+    """Read the maintained counts (one document read)
+
+    Writes only add increments to meta/stats, so on a catalog that
+    predates it the first write creates a document counting just that
+    change. The counts are only trusted once repair_stats has recorded a
+    baseline (python -m catalog repair).
+
+    Returns:
+        dict: {"total", "published", "drafts", "categories", "byCategory"},
+        or None if meta/stats has no baseline yet
+    """
+    snapshot = _stats_ref(db).get()
+    if not snapshot.exists or STATS_BASELINE_FIELD not in snapshot.to_dict():
+        return None
+    return _stats_result(snapshot.to_dict())
+
+
+def _stats_result(data):
+    total = data.get("total", 0)
+    published = data.get("published", 0)
+    return {
+        "total": total,
+        "published": published,
+        "drafts": total - published,
+        "categories": data.get("categories", 0),
+        "byCategory": data.get("byCategory", {})
+    }
+
+
+def repair_stats(db):
+    """Recompute meta/stats from the games and categories collections
+
+    Reads only the published and categoryId fields of every game, and
+    marks the result as a baseline for read_stats. Run it once after
+    deploying, and again if the counts ever drift, while no admin is
+    writing: increments committed between the scan and the final set()
+    are overwritten.
+
+    Returns:
+        dict: The counts written
+    """
+    counts = Counter()
+    for snapshot in db.collection("games").select(["published", "categoryId"]).stream():
+        _count_game(counts, snapshot.to_dict(), 1)
+
+    stats = {"total": 0, "published": 0, "byCategory": {}, "updatedAt": SERVER_TIMESTAMP,
+             STATS_BASELINE_FIELD: SERVER_TIMESTAMP}
+    for path, value in counts.items():
+        node = stats
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    stats["categories"] = count_documents(db.collection("categories"))
+
+    _stats_ref(db).set(stats)
+    return stats
+
+
+def ensure_page_order(collection, total):
+    """Backfill createdAt if fewer than total documents have it
+
+    Ordering by createdAt skips documents without the field, so games
+    from before it was written would be counted but never listed. One
+    count() query tells whether any are missing.
+
+    Returns:
+        int: Number of documents backfilled
+    """
+    if count_documents(collection.order_by(PAGE_ORDER_FIELD)) >= total:
+        return 0
+    print(f"Some games have no {PAGE_ORDER_FIELD}, backfilling")
+    return backfill_created_at(collection)
+
+
+def backfill_created_at(collection):
+    """Give every document without createdAt its Firestore create time
+
+    Documents missing the ordering field are invisible to GamePager;
+    ensure_page_order runs this when it finds any.
+
+    Returns:
+        int: Number of documents updated
+    """
+    updated = 0
+    for doc in collection.select([PAGE_ORDER_FIELD]).stream():
+        if PAGE_ORDER_FIELD not in (doc.to_dict() or {}):
+            doc.reference.update({PAGE_ORDER_FIELD: doc.create_time})
+            updated += 1
+    return updated
+
+
+if __name__ == "__main__":
+    # python -m catalog [backfill|titles|repair|tokens]
+    from firestore_utils import db
+
+    job = sys.argv[1] if len(sys.argv) > 1 else "backfill"
+    if job == "titles":
+        reserved, clashes = reserve_titles(db)
+        print(f"Reserved {reserved} title(s)")
+        for title in clashes:
+            print(f"Title held by more than one game: {title}")
+    elif job == "tokens":
+        print(f"Wrote {SEARCH_TOKENS_FIELD} on {backfill_search_tokens(db)} game(s)")
+    elif job == "repair":
+        stats = repair_stats(db)
+        print(f"Recomputed {STATS_COLLECTION}/{STATS_DOCUMENT}: {stats['total']} game(s), "
+              f"{stats['published']} published, {stats['categories']} categories")
+    else:
+        print(f"Backfilled {PAGE_ORDER_FIELD} on {backfill_created_at(db.collection('games'))} game(s)")
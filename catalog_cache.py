@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import Counter
+
+# Seconds a cached collection is served before it is reloaded
+CACHE_TTL = 300
+
+
+class CatalogCache:
+    """Firestore collections cached once per process and shared by all sessions
+
+    Each key (e.g. "games", "categories") holds whatever its loader
+    returned. Concurrent misses on the same key share a single load, and
+    invalidate() is seen by every session at once, so Firestore reads
+    follow writes and TTL expiry rather than sessions x reruns.
+
+    Cached values are shared: callers must copy before mutating them.
+
+    Usage:
+        cache = CatalogCache(ttl=300)
+        games = cache.get("games", lambda: list(db.collection("games").stream()))
+        cache.invalidate("games")  # after any write to games
+    """
+
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._entries = {}  # key -> {"data", "loaded_at", "valid"}
+        self.hits = Counter()
+        self.misses = Counter()
+        self.invalidations = Counter()
+
+    def _fresh(self, entry):
+        return entry is not None and entry["valid"] and time.time() - entry["loaded_at"] < self.ttl
+
+    def is_valid(self, key):
+        """True if key is loaded, not invalidated and younger than ttl"""
+        with self._lock:
+            return self._fresh(self._entries.get(key))
+
+    def get(self, key, loader):
+        """Return the cached value for key, calling loader() on a miss
+
+        Exceptions from loader propagate; the previous value is kept and
+        still available through peek().
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if self._fresh(entry):
+                self.hits[key] += 1
+                return entry["data"]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another session may have loaded it while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if self._fresh(entry):
+                    self.hits[key] += 1
+                    return entry["data"]
+                self.misses[key] += 1
+
+            data = loader()
+            with self._lock:
+                self._entries[key] = {"data": data, "loaded_at": time.time(), "valid": True}
+            return data
+
+    def peek(self, key):
+        """Return the last loaded value for key even if stale, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry["data"] if entry else None
+
+    def age(self, key):
+        """Seconds since key was loaded, or None if never loaded"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return time.time() - entry["loaded_at"] if entry else None
+
+    def invalidate(self, key=None):
+        """Force a reload of key (or every key) on next get, in all sessions"""
+        with self._lock:
+            keys = [key] if key else list(self._entries)
+            for k in keys:
+                if k in self._entries:
+                    self._entries[k]["valid"] = False
+                self.invalidations[k] += 1
+
+    def stats(self):
+        """Return {key: {"hits", "misses", "invalidations", "age"}}"""
+        with self._lock:
+            keys = set(self.hits) | set(self.misses) | set(self._entries)
+            now = time.time()
+            return {
+                key: {
+                    "hits": self.hits[key],
+                    "misses": self.misses[key],
+                    "invalidations": self.invalidations[key],
+                    "age": now - self._entries[key]["loaded_at"] if key in self._entries else None
+                }
+                for key in sorted(keys)
+            }
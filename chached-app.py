@@ -1,14 +1,23 @@
 import streamlit as st
-import zipfile, os, shutil, base64, math
-from utils import slugify
-from github_utils import upload_file, list_files, delete_file
+import zipfile, os, shutil, math
+from utils import slugify, collect_files
+from metrics import render_metrics_panel
+from storage import get_storage
 from firestore_utils import db
-from settings import ADMIN_PASSWORD, BASE_URL
-from datetime import datetime, timedelta
+from settings import ADMIN_PASSWORD
+from catalog_cache import CatalogCache
+from games_index import GamesIndex
+from search_index import SearchIndex
+from models import Game, GAME_FIELDS
+from catalog import (add_game, update_game, delete_games, add_category,
+                     find_game, taken_titles, normalize_title, update_games, get_games)
+from datetime import timedelta
 import time
 import uuid
 from google.cloud.firestore import SERVER_TIMESTAMP
 
+storage = get_storage()
+
 
 
 # =====================================================
@@ -25,38 +34,22 @@ st.set_page_config(
 # =====================================================
 CACHE_DURATION = timedelta(minutes=5)  # Cache data for 5 minutes
 
-# Initialize session state for caching
-if "cache" not in st.session_state:
-    st.session_state.cache = {
-        "categories": {"data": None, "timestamp": None},
-        "games": {"data": None, "timestamp": None}
-    }
+@st.cache_resource
+def get_catalog_cache():
+    """One catalog cache per server process, shared by every session"""
+    return CatalogCache(ttl=CACHE_DURATION.total_seconds())
+
+catalog = get_catalog_cache()
 
 def is_cache_valid(cache_key):
     """Check if cache is still valid"""
-    cache = st.session_state.cache.get(cache_key)
-    if cache["data"] is None or cache["timestamp"] is None:
-        return False
-    
-    elapsed = datetime.now() - cache["timestamp"]
-    return elapsed < CACHE_DURATION
+    return catalog.is_valid(cache_key)
 
 def get_cached_data(cache_key, fetch_function, max_retries=3):
-    """Get data from cache or fetch from Firestore with retry logic"""
-    # Check if cache is valid
-    if is_cache_valid(cache_key):
-        return st.session_state.cache[cache_key]["data"]
-    
-    # Fetch fresh data with retry logic
+    """Get data from the shared cache or fetch from Firestore with retry logic"""
     for attempt in range(max_retries):
         try:
-            data = fetch_function()
-            # Update cache
-            st.session_state.cache[cache_key] = {
-                "data": data,
-                "timestamp": datetime.now()
-            }
-            return data
+            return catalog.get(cache_key, fetch_function)
         except Exception as e:
             if attempt < max_retries - 1:
                 wait_time = (attempt + 1) * 2  # Exponential backoff: 2s, 4s, 6s
@@ -65,19 +58,15 @@ def get_cached_data(cache_key, fetch_function, max_retries=3):
             else:
                 st.error(f"❌ Failed to fetch data after {max_retries} attempts: {str(e)}")
                 # Return cached data if available, even if expired
-                if st.session_state.cache[cache_key]["data"] is not None:
+                stale = catalog.peek(cache_key)
+                if stale is not None:
                     st.warning("⚠️ Using cached data (may be outdated)")
-                    return st.session_state.cache[cache_key]["data"]
+                    return stale
                 raise
 
 def invalidate_cache(cache_key=None):
-    """Invalidate specific cache or all caches"""
-    if cache_key:
-        st.session_state.cache[cache_key] = {"data": None, "timestamp": None}
-    else:
-        # Invalidate all caches
-        for key in st.session_state.cache:
-            st.session_state.cache[key] = {"data": None, "timestamp": None}
+    """Invalidate specific cache or all caches, for every session"""
+    catalog.invalidate(cache_key)
 
 def fetch_categories():
     """Fetch categories from Firestore"""
@@ -85,8 +74,23 @@ def fetch_categories():
     return {c.id: c.to_dict().get("name", "Unnamed") for c in categories_docs}
 
 def fetch_games():
-    """Fetch games from Firestore"""
-    return list(db.collection("games").stream())
+    """Fetch games from Firestore as Game records, newest first"""
+    games = [Game.from_snapshot(d) for d in db.collection("games").select(GAME_FIELDS).stream()]
+    return sorted(games, key=lambda g: g.createdAt, reverse=True)
+
+@st.cache_resource
+def get_games_index():
+    """One live games listener per server process, shared by every session"""
+    return GamesIndex(db.collection("games")).start()
+
+games_index = get_games_index()
+
+@st.cache_resource
+def get_search_index():
+    """One title/slug search index per server process, synced with the games list on search"""
+    return SearchIndex()
+
+search_index = get_search_index()
 
 # =====================================================
 # CUSTOM CSS
@@ -312,17 +316,24 @@ with col2:
         st.rerun()
 
 # Show cache status
-if is_cache_valid("categories") and is_cache_valid("games"):
-    cache_age = (datetime.now() - st.session_state.cache["games"]["timestamp"]).seconds
-    st.markdown(f'<div class="cache-info">✅ Using cached data ({cache_age}s old) | Auto-refresh in {300 - cache_age}s</div>', unsafe_allow_html=True)
+index_status = games_index.status()
+if index_status["active"] and index_status["age"] is not None:
+    st.markdown(f'<div class="cache-info">🟢 Live games index ({index_status["documents"]} games, last change {int(index_status["age"])}s ago) | Categories cached for {int(catalog.ttl)}s</div>', unsafe_allow_html=True)
+elif is_cache_valid("categories") and is_cache_valid("games"):
+    cache_age = int(catalog.age("games"))
+    games_stats = catalog.stats()["games"]
+    lookups = games_stats["hits"] + games_stats["misses"]
+    hit_rate = games_stats["hits"] / lookups if lookups else 0
+    st.markdown(f'<div class="cache-info">✅ Using shared cached data ({cache_age}s old) | Auto-refresh in {int(catalog.ttl) - cache_age}s | Hit rate {hit_rate:.0%}</div>', unsafe_allow_html=True)
 
 # =====================================================
 # LOAD CATEGORIES & STATS (WITH CACHING)
 # =====================================================
 try:
     categories = get_cached_data("categories", fetch_categories)
-    all_games = get_cached_data("games", fetch_games)
-    published_count = sum(1 for g in all_games if g.to_dict().get("published", False))
+    # Live listener first; polling the collection is only the fallback
+    all_games = games_index.games() if games_index.wait_ready() else get_cached_data("games", fetch_games)
+    published_count = sum(1 for g in all_games if g.published)
 except Exception as e:
     st.error(f"❌ Critical error loading data: {str(e)}")
     st.info("💡 Try refreshing the page or check your Firestore connection")
@@ -374,7 +385,7 @@ with st.expander("📂 Manage Categories", expanded=False):
     if col2.button("➕ Add", use_container_width=True):
         if new_cat.strip():
             try:
-                db.collection("categories").add({"name": new_cat.strip()})
+                add_category(db, new_cat.strip())
                 invalidate_cache("categories")  # Invalidate categories cache
                 st.success("✅ Category added successfully")
                 st.rerun()
@@ -386,98 +397,98 @@ with st.expander("📂 Manage Categories", expanded=False):
 # =====================================================
 # HELPER FUNCTION FOR GAME UPLOAD
 # =====================================================
-def process_single_game(title, zip_file_content, category_id, zip_filename=""):
+def extract_game(title, zip_file_content):
+    """Extract a game ZIP into tmp/<slug>. Returns (slug, tmp_dir, files)"""
+    slug = f"{slugify(title.strip())}"
+
+    os.makedirs("tmp", exist_ok=True)
+    tmp_dir = f"tmp/{slug}"
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    zip_path = f"{tmp_dir}.zip"
+    with open(zip_path, "wb") as f:
+        f.write(zip_file_content)
+
+    with zipfile.ZipFile(zip_path) as z:
+        z.extractall(tmp_dir)
+
+    # Flatten single root folder
+    items = os.listdir(tmp_dir)
+    if len(items) == 1 and os.path.isdir(os.path.join(tmp_dir, items[0])):
+        inner = os.path.join(tmp_dir, items[0])
+        for item in os.listdir(inner):
+            shutil.move(os.path.join(inner, item), tmp_dir)
+        shutil.rmtree(inner)
+
+    return slug, tmp_dir, collect_files(tmp_dir)
+
+
+def cleanup_game(tmp_dir):
+    """Remove an extracted game folder and its ZIP"""
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    if os.path.exists(f"{tmp_dir}.zip"):
+        os.remove(f"{tmp_dir}.zip")
+
+
+def register_game(title, slug, category_id):
+    """Add an uploaded game to Firestore (never update)"""
+    url = storage.url_for(slug)
+
+    game_data = {
+        "title": title,
+        "titleNormalized": title.lower(),
+        "slug": slug,
+        "categoryId": category_id,
+        "url": url,
+        "published": True,
+         # ✅ REQUIRED FOR "NEW GAME FIRST"
+        "createdAt": SERVER_TIMESTAMP,
+    }
+
+    update_time, _ = add_game(db, game_data)
+    games_index.wait_until(update_time)
+    invalidate_cache("games")
+
+
+def process_single_game(title, zip_file_content, category_id, zip_filename="", progress_callback=None):
     """
     Upload a single game safely.
     - No overwrite
     - Duplicate title blocked
     - Unique slug per game
     """
+    tmp_dir = None
     try:
         title_clean = title.strip()
         title_norm = title_clean.lower()
 
-        # ---------------- DUPLICATE CHECK ----------------
-        duplicates = [
-            g for g in all_games
-            if g.to_dict().get("titleNormalized") == title_norm
-        ]
-
-        if duplicates:
+        # ---------------- DUPLICATE CHECK (ONE KEYED READ) ----------------
+        if find_game(db, title_norm) is not None:
             return False, f"Duplicate title '{title_clean}' already exists. Upload blocked."
 
-        # ---------------- UNIQUE SLUG ----------------
-        #unique_id = uuid.uuid4().hex[:8]
-        #slug = f"{slugify(title_clean)}-{unique_id}"
-        slug = f"{slugify(title_clean)}"
-
-        # ---------------- TEMP DIR ----------------
-        os.makedirs("tmp", exist_ok=True)
-        tmp_dir = f"tmp/{slug}"
-        os.makedirs(tmp_dir, exist_ok=True)
-
-        zip_path = f"{tmp_dir}.zip"
-        with open(zip_path, "wb") as f:
-            f.write(zip_file_content)
-
-        with zipfile.ZipFile(zip_path) as z:
-            z.extractall(tmp_dir)
-
-        # Flatten single root folder
-        items = os.listdir(tmp_dir)
-        if len(items) == 1 and os.path.isdir(os.path.join(tmp_dir, items[0])):
-            inner = os.path.join(tmp_dir, items[0])
-            for item in os.listdir(inner):
-                shutil.move(os.path.join(inner, item), tmp_dir)
-            shutil.rmtree(inner)
-
-        # ---------------- UPLOAD TO GITHUB ----------------
-        uploaded_files = []
-
-        for root, _, files in os.walk(tmp_dir):
-            for file in files:
-                full = os.path.join(root, file)
-                rel = os.path.relpath(full, tmp_dir).replace("\\", "/")
-                github_path = f"{slug}/{rel}"
-
-                with open(full, "rb") as f:
-                    content = base64.b64encode(f.read()).decode()
-                    result = upload_file(github_path, content)
-
-                if not result.get("success"):
-                    raise Exception(f"Failed uploading {github_path}")
-
-                uploaded_files.append(github_path)
-
-        if not uploaded_files:
+        # ---------------- EXTRACT ----------------
+        slug, tmp_dir, files = extract_game(title_clean, zip_file_content)
+        if not files:
             raise Exception("No files uploaded")
 
-        # ---------------- FIRESTORE ADD (NEVER UPDATE) ----------------
-        url = f"{BASE_URL}/{slug}/index.html"
-
-        game_data = {
-            "title": title,
-            "titleNormalized": title.lower(),
-            "slug": slug,
-            "categoryId": category_id,
-            "url": url,
-            "published": True,
-             # ✅ REQUIRED FOR "NEW GAME FIRST"
-            "createdAt": SERVER_TIMESTAMP,
-        }
+        # ---------------- UPLOAD TO STORAGE (ONE COMMIT ON GITHUB) ----------------
+        result = storage.put_many(slug, files, progress_callback=progress_callback)
+        if not result.get("success"):
+            raise Exception(f"Failed uploading {slug}: {result.get('message')}")
 
-        db.collection("games").add(game_data)
-        invalidate_cache("games")
+        # ---------------- FIRESTORE ADD (NEVER UPDATE) ----------------
+        register_game(title, slug, category_id)
 
-        return True, f"Uploaded {len(uploaded_files)} file(s)"
+        return True, f"Uploaded {len(result['files'])} file(s)"
 
     except Exception as e:
-        if os.path.exists(tmp_dir):
-            shutil.rmtree(tmp_dir)
-        if os.path.exists(zip_path):
-            os.remove(zip_path)
         return False, str(e)
 
+    finally:
+        if tmp_dir:
+            cleanup_game(tmp_dir)
+
 
 # =====================================================
 # UPLOAD GAME (SINGLE & BULK)
@@ -570,39 +581,61 @@ if upload_btn:
             "replaced": []
         }
         
+        # ---------------- EXTRACT ALL ZIPS ----------------
+        prepared = {}  # slug -> (title, tmp_dir)
+        games = {}     # slug -> files
+
+        # Every title reservation read in one round trip
+        taken = taken_titles(db, [os.path.splitext(zip_file.name)[0] for zip_file in zip_files])
+
         for idx, zip_file in enumerate(zip_files):
             # Extract title from filename (remove .zip extension)
             title = os.path.splitext(zip_file.name)[0]
             
-            status_text.text(f"Processing {idx + 1}/{len(zip_files)}: {title}")
+            status_text.text(f"Extracting {idx + 1}/{len(zip_files)}: {title}")
             
-            # Check if game already exists - use cached data
-            existing = [
-                g for g in all_games
-                if g.to_dict().get("titleNormalized") == title.lower()
-            ]
-
-            if existing:
+            if normalize_title(title) in taken or slugify(title.strip()) in games:
                 st.error(f"❌ {title}: Duplicate title exists. Skipped.")
                 continue
-    
 
-            was_existing = len(existing) > 0
-            
-            success, message = process_single_game(title, zip_file.read(), category_id, zip_file.name)
-            
-            if success:
-                if was_existing:
-                    results["replaced"].append(f"{title}: {message}")
-                    st.info(f"🔄 {title}: {message}")
-                else:
-                    results["success"].append(f"{title}: {message}")
-                    st.success(f"✅ {title}: {message}")
+            try:
+                slug, tmp_dir, files = extract_game(title, zip_file.read())
+            except Exception as e:
+                results["failed"].append(f"{title}: {str(e)}")
+                st.error(f"❌ {title}: {str(e)}")
+                continue
+
+            prepared[slug] = (title, tmp_dir)
+            if files:
+                games[slug] = files
+
+        # ---------------- UPLOAD ALL GAMES (ONE BATCH) ----------------
+        def show_file_progress(done, total, path):
+            progress_bar.progress(done / total)
+            status_text.text(f"Uploading {done}/{total} files: {path}")
+
+        upload_results = storage.put_games(games, progress_callback=show_file_progress) if games else {}
+
+        # ---------------- FIRESTORE ADD ----------------
+        for slug, (title, tmp_dir) in prepared.items():
+            cleanup_game(tmp_dir)
+            result = upload_results.get(slug, {"success": False, "message": "No files uploaded"})
+
+            if result["success"]:
+                try:
+                    register_game(title, slug, category_id)
+                except Exception as e:
+                    result = {"success": False, "message": str(e)}
+
+            message = result["message"]
+            if result["success"]:
+                results["success"].append(f"{title}: {message}")
+                st.success(f"✅ {title}: {message}")
             else:
                 results["failed"].append(f"{title}: {message}")
                 st.error(f"❌ {title}: {message}")
-            
-            progress_bar.progress((idx + 1) / len(zip_files))
+
+        progress_bar.progress(1.0)
         
         status_text.text("✅ Bulk upload completed!")
         
@@ -639,21 +672,19 @@ st.markdown('<div class="section-header">🎯 Manage Games</div>', unsafe_allow_
 
 col1, col2, col3 = st.columns([3, 1, 1])
 search = col1.text_input("🔍 Search", placeholder="Search by title or slug")
+fuzzy = col3.toggle("🪄 Fuzzy", help="Also match titles a typo or two away, e.g. 'filomino'")
 page_size = col2.selectbox("Items per page", [5, 10, 20, 50, 100], index=1)
 
 if "page" not in st.session_state:
     st.session_state.page = 1
 
-# Use cached games data
-docs = all_games.copy()
-docs.sort(key=lambda d: d.id, reverse=True)
+# Use cached games data (already newest first, from the live index or fetch_games)
+docs = all_games
 
 if search:
-    docs = [
-        d for d in docs
-        if search.lower() in d.to_dict().get("title", "").lower()
-        or search.lower() in d.to_dict().get("slug", "").lower()
-    ]
+    # Re-indexes only games that changed since the last search, then ranks the matches
+    search_index.sync(all_games)
+    docs = search_index.search(search, fuzzy=fuzzy)
 
 total = len(docs)
 total_pages = max(1, math.ceil(total / page_size))
@@ -693,10 +724,9 @@ if total == 0:
     st.info("🔭 No games found. Upload your first game to get started!")
 else:
     for g in page_docs:
-        data = g.to_dict()
-        slug = data.get("slug", slugify(data.get("title", "")))
-        cat = categories.get(data.get("categoryId"), "Uncategorized")
-        is_published = data.get("published", False)
+        slug = g.slug
+        cat = categories.get(g.categoryId, "Uncategorized")
+        is_published = g.published
 
         st.markdown('<div class="game-item">', unsafe_allow_html=True)
         
@@ -707,7 +737,7 @@ else:
             selected.add(g.id)
 
         with c2:
-            st.markdown(f"### 🎮 {data.get('title')}")
+            st.markdown(f"### 🎮 {g.title}")
             badge_class = "badge-published" if is_published else "badge-draft"
             status = "Published" if is_published else "Draft"
             st.markdown(
@@ -724,21 +754,21 @@ else:
         )
         if pub != is_published:
             try:
-                db.collection("games").document(g.id).update({"published": pub})
+                games_index.wait_until(update_game(db, g.id, {"published": pub}))
                 invalidate_cache("games")  # Invalidate games cache
                 st.rerun()
             except Exception as e:
                 st.error(f"❌ Error updating game: {str(e)}")
 
         if c4.button("👁", key=f"prev_{g.id}", use_container_width=True, help="Preview game"):
-            st.components.v1.iframe(data["url"], height=600, scrolling=True)
+            st.components.v1.iframe(g.url, height=600, scrolling=True)
 
         if c5.button("🗑 Delete", key=f"del_{g.id}", use_container_width=True, type="secondary"):
             try:
-                files = list_files(slug)
-                for f in files:
-                    delete_file(f["path"], f["sha"])
-                db.collection("games").document(g.id).delete()
+                result = storage.delete_many([slug])
+                if not result.get("success"):
+                    raise Exception(result.get("message"))
+                games_index.wait_until(delete_games(db, [g.id]))
                 invalidate_cache("games")  # Invalidate games cache
                 st.success("✅ Game deleted successfully")
                 st.rerun()
@@ -747,6 +777,43 @@ else:
 
         st.markdown('</div>', unsafe_allow_html=True)
 
+# =====================================================
+# BULK ACTIONS
+# =====================================================
+def bulk_update(changes, done_message):
+    """Apply the same changes to every selected game with batched writes"""
+    try:
+        commit_time = update_games(db, selected, changes)
+        games_index.wait_until(commit_time)
+        invalidate_cache("games")
+        for game_id in selected:
+            # Row checkboxes would otherwise keep (and write back) the old state
+            st.session_state.pop(f"pub_{game_id}", None)
+            st.session_state.pop(f"sel_{game_id}", None)
+        st.success(done_message)
+        st.rerun()
+    except Exception as e:
+        st.error(f"❌ Error updating games: {str(e)}")
+
+if selected:
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown(f"**{len(selected)} game(s) selected**")
+    b1, b2, b3, b4 = st.columns([1, 1, 2, 1])
+    if b1.button("✅ Publish", use_container_width=True):
+        bulk_update({"published": True}, f"✅ {len(selected)} game(s) published")
+    if b2.button("🚫 Unpublish", use_container_width=True):
+        bulk_update({"published": False}, f"✅ {len(selected)} game(s) unpublished")
+    if categories:
+        target_category = b3.selectbox(
+            "Move to category",
+            list(categories.keys()),
+            format_func=lambda x: categories[x],
+            key="bulk_category",
+            label_visibility="collapsed"
+        )
+        if b4.button("📂 Move", use_container_width=True):
+            bulk_update({"categoryId": target_category}, f"✅ {len(selected)} game(s) moved to {categories[target_category]}")
+
 # =====================================================
 # BULK DELETE
 # =====================================================
@@ -757,16 +824,18 @@ if selected:
         if st.button(f"🧹 Delete {len(selected)} Selected Game(s)", use_container_width=True, type="primary"):
             with st.spinner("Deleting selected games..."):
                 try:
-                    for game_id in selected:
-                        doc = db.collection("games").document(game_id).get()
-                        data = doc.to_dict()
-                        slug = data.get("slug", slugify(data.get("title", "")))
+                    # One round trip for every selected game
+                    slugs = [
+                        Game.from_snapshot(doc).slug
+                        for doc in get_games(db, selected, ["slug", "title"])
+                    ]
 
-                        files = list_files(slug)
-                        for f in files:
-                            delete_file(f["path"], f["sha"])
+                    # One commit removes every selected game folder
+                    result = storage.delete_many(slugs)
+                    if not result.get("success"):
+                        raise Exception(result.get("message"))
 
-                        db.collection("games").document(game_id).delete()
+                    games_index.wait_until(delete_games(db, selected))
 
                     invalidate_cache("games")  # Invalidate games cache
                     st.success(f"✅ {len(selected)} game(s) deleted successfully")
@@ -774,6 +843,12 @@ if selected:
                 except Exception as e:
                     st.error(f"❌ Error during bulk delete: {str(e)}")
 
+# =====================================================
+# REQUEST METRICS
+# =====================================================
+with st.expander("📈 Request Metrics", expanded=False):
+    render_metrics_panel()
+
 # =====================================================
 # FOOTER
 # =====================================================
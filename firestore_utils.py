@@ -2,6 +2,7 @@ import firebase_admin
 from firebase_admin import credentials, firestore
 import os
 from settings import FIREBASE_CRED
+from metrics import instrument_firestore
 
 if not os.path.exists(FIREBASE_CRED): 
     raise FileNotFoundError("❌ serviceAccount.json not found")
@@ -10,4 +11,4 @@ if not firebase_admin._apps:
     cred = credentials.Certificate(FIREBASE_CRED)
     firebase_admin.initialize_app(cred)
 
-db = firestore.client()
+db = instrument_firestore(firestore.client())
@@ -0,0 +1,173 @@
+import threading
+import time
+
+from models import Game
+
+# Seconds to wait for the listener's first snapshot before falling back to a query
+READY_TIMEOUT = 10
+
+# Seconds before restarting a listener that never became ready (doubles per failure)
+RETRY_BASE_DELAY = 5
+RETRY_MAX_DELAY = 300
+
+# Seconds a writer waits for its own change to reach the index
+WRITE_VISIBLE_TIMEOUT = 3
+
+
+class GamesIndex:
+    """In-memory copy of a Firestore collection kept live by one on_snapshot listener
+
+    The listener delivers the whole collection once, then only the
+    documents that were added, modified or removed. Each is converted to
+    a Game as it arrives, so readers get the current catalog with no
+    Firestore round trip and still see other admins' writes within about
+    a second.
+
+    Usage:
+        index = GamesIndex(db.collection("games")).start()
+        if index.wait_ready():
+            games = index.games()
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._lock = threading.Condition()
+        self._games = {}  # doc id -> Game
+        self._list = None  # games() result for the current version, sorted once
+        self._watch = None
+        self._start_lock = threading.Lock()
+        self._resync = True
+        self._ready = threading.Event()
+        self.version = 0
+        self.read_time = None
+        self.updated_at = None
+        self.restarts = 0
+        self.failures = 0  # consecutive start-ups that never delivered a snapshot
+        self._retry_at = 0
+
+    def start(self):
+        """Start (or restart) the listener and return self"""
+        with self._start_lock:
+            # Not under _lock: unsubscribe joins the listener thread, which takes _lock
+            if self._watch is not None:
+                self._watch.unsubscribe()
+                self.restarts += 1
+            self._resync = True
+            self._watch = self.collection.on_snapshot(self._on_snapshot)
+        return self
+
+    def stop(self):
+        with self._start_lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+                self._watch = None
+
+    @property
+    def is_active(self):
+        return self._watch is not None and self._watch.is_active
+
+    def _on_snapshot(self, docs, changes, read_time):
+        """Apply one batch of changes from the listener thread"""
+        with self._lock:
+            if self._resync:
+                # First snapshot of a (re)started listener carries the whole collection
+                self._games = {doc.id: Game.from_snapshot(doc) for doc in docs}
+                self._resync = False
+                changed = True
+            else:
+                for change in changes:
+                    if change.type.name == "REMOVED":
+                        self._games.pop(change.document.id, None)
+                    else:
+                        self._games[change.document.id] = Game.from_snapshot(change.document)
+                changed = bool(changes)
+            if changed:
+                self.version += 1
+                self._list = None
+            self.read_time = read_time
+            self.updated_at = time.time()
+            self.failures = 0
+            self._lock.notify_all()
+        self._ready.set()
+
+    def wait_ready(self, timeout=READY_TIMEOUT):
+        """Wait for the first snapshot, restarting a listener that has died
+
+        Blocks for timeout only until the listener has failed once (e.g.
+        streaming blocked by a proxy). After that it returns at once, so
+        callers fall back to queries immediately, and the listener is
+        restarted in the background on a backoff schedule.
+
+        Returns:
+            bool: True if the index holds the collection
+        """
+        if self._ready.is_set() and not self.is_active:
+            print("Games listener stopped, restarting")
+            self._ready.clear()
+            self.start()
+        if self._ready.is_set():
+            return True
+
+        if self.failures:
+            if time.time() >= self._retry_at:
+                print(f"Games listener not ready, restart attempt {self.failures}")
+                self._schedule_retry()
+                self.start()
+            return self._ready.is_set()
+
+        if self._ready.wait(timeout):
+            return True
+        print(f"Games listener sent no snapshot within {timeout}s, using queries")
+        self._schedule_retry()
+        return False
+
+    def _schedule_retry(self):
+        self.failures += 1
+        self._retry_at = time.time() + min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (self.failures - 1))
+
+    def wait_until(self, write_time, timeout=WRITE_VISIBLE_TIMEOUT):
+        """Block until a write committed at write_time is reflected in the index
+
+        Lets a session read its own write right after making it. A
+        write_time of None (nothing was written, e.g. the games were
+        already deleted) returns at once.
+
+        Returns:
+            bool: False if the listener did not catch up within timeout
+        """
+        if write_time is None:
+            return True
+        if not self.is_active:
+            return False
+        deadline = time.time() + timeout
+        with self._lock:
+            while self.read_time is None or self.read_time < write_time:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def games(self):
+        """Return every Game, newest first (shared list, copy before mutating)"""
+        with self._lock:
+            if self._list is None:
+                self._list = sorted(self._games.values(), key=lambda g: g.createdAt, reverse=True)
+            return self._list
+
+    def get(self, doc_id):
+        """Return one Game by id, or None"""
+        with self._lock:
+            return self._games.get(doc_id)
+
+    def status(self):
+        """Return a snapshot of the listener state"""
+        with self._lock:
+            return {
+                "active": self.is_active,
+                "documents": len(self._games),
+                "version": self.version,
+                "age": time.time() - self.updated_at if self.updated_at else None,
+                "restarts": self.restarts,
+                "failures": self.failures
+            }
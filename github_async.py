@@ -0,0 +1,332 @@
+import asyncio
+import json
+import random
+import time
+
+import aiohttp
+
+from github_utils import (
+    HEADERS, REQUEST_TIMEOUT, RATE_LIMIT_RETRIES, MAX_RETRIES, RETRY_STATUSES,
+    RETRY_BASE_DELAY, RETRY_MAX_DELAY, CONFLICT_RETRIES,
+    Base64JSONBody, GitHubError, rate_limiter, _operation, _repo_url
+)
+from metrics import metrics
+from settings import GITHUB_BRANCH
+
+# Requests in flight at once on the event loop
+ASYNC_CONCURRENCY = 32
+
+
+async def _backoff(attempt):
+    """Sleep for a jittered exponential delay before retry number attempt"""
+    await asyncio.sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)))
+
+
+def _decode(text):
+    """Decode a JSON body, falling back to the raw text"""
+    try:
+        return json.loads(text) if text else {}
+    except ValueError:
+        return text
+
+
+class AsyncGitHubClient:
+    """asyncio counterpart of the github_utils API
+
+    Multiplexes many requests on one event loop and one connection pool,
+    bounded by a semaphore. Shares github_utils.rate_limiter and its
+    retry policy, so sync and async callers pace each other.
+
+    Usage:
+        async with AsyncGitHubClient() as gh:
+            files = await gh.list_files("tectonic")
+    """
+
+    def __init__(self, concurrency=ASYNC_CONCURRENCY):
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # Bounds batch items separately so queued work (e.g. file reads) can't pile up
+        self.batch_semaphore = asyncio.Semaphore(concurrency)
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            headers=HEADERS,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            connector=aiohttp.TCPConnector(limit=self.concurrency)
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def _request(self, method, url, **kwargs):
+        """Send a request with rate limiting and retries, recorded in metrics
+
+        Returns:
+            tuple: (status, decoded JSON body or text)
+        """
+        throttled = failures = 0
+        status = sent = received = 0
+        started = None
+
+        try:
+            async with self.semaphore:
+                started = time.perf_counter()  # Time queued behind the semaphore is not latency
+                while True:
+                    await rate_limiter.acquire_async(method)
+                    status = 0
+                    try:
+                        async with self.session.request(method, url, **kwargs) as response:
+                            status = response.status
+                            headers = response.headers
+                            text = await response.text()
+                            sent = int(response.request_info.headers.get("Content-Length", 0))
+                            received = response.content_length or len(text)
+                    except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                        if failures >= MAX_RETRIES:
+                            raise
+                        failures += 1
+                        print(f"GitHub {method} {url} failed ({e!r}), retry {failures}/{MAX_RETRIES}")
+                        await _backoff(failures)
+                        continue
+
+                    if rate_limiter.record(method, status, headers, text):
+                        if throttled >= RATE_LIMIT_RETRIES:
+                            return status, _decode(text)
+                        throttled += 1
+                        continue
+
+                    if status in RETRY_STATUSES and failures < MAX_RETRIES:
+                        failures += 1
+                        print(f"GitHub {method} {url} returned {status}, retry {failures}/{MAX_RETRIES}")
+                        await _backoff(failures)
+                        continue
+
+                    return status, _decode(text)
+
+        finally:
+            if started is not None:
+                if not sent and hasattr(kwargs.get("data"), "__len__"):
+                    sent = len(kwargs["data"])  # Streamed bodies go out chunked, without Content-Length
+                metrics.record("github", _operation(method, url), time.perf_counter() - started,
+                               status, sent=sent, received=received, retries=throttled + failures)
+
+    async def _check(self, method, url, ok, **kwargs):
+        """Send a request and return its body, raising GitHubError on unexpected status"""
+        status, body = await self._request(method, url, **kwargs)
+        if status != ok:
+            raise GitHubError(status, str(body)[:500])
+        return body
+
+    async def _current_sha(self, url):
+        """Return the SHA of the file at a contents URL on GITHUB_BRANCH, or None"""
+        status, body = await self._request("GET", url, params={"ref": GITHUB_BRANCH})
+        return body.get("sha") if status == 200 else None
+
+    # -------------------------------------------------
+    # Contents API (same results as github_utils)
+    # -------------------------------------------------
+    async def list_files(self, path):
+        """List files in a GitHub repository path"""
+        status, body = await self._request("GET", _repo_url(f"contents/{path}"))
+        return body if status == 200 else []
+
+    async def upload_file(self, path, base64_content):
+        """Upload a file to GitHub repository
+
+        Returns:
+            dict: {"success": bool, "status": int, "message": str}
+        """
+        url = _repo_url(f"contents/{path}")
+
+        try:
+            existing_sha = await self._current_sha(url)
+
+            for attempt in range(CONFLICT_RETRIES + 1):
+                payload = {
+                    "message": f"Update {path}" if existing_sha else f"Add {path}",
+                    "content": base64_content,
+                    "branch": GITHUB_BRANCH
+                }
+                if existing_sha:
+                    payload["sha"] = existing_sha
+
+                status, body = await self._request("PUT", url, json=payload)
+
+                if status in [200, 201]:
+                    action = "Updated" if existing_sha else "Created"
+                    return {"success": True, "status": status, "message": f"{action} successfully"}
+
+                if status in [409, 422] and attempt < CONFLICT_RETRIES:
+                    existing_sha = await self._current_sha(url)
+                    await _backoff(attempt + 1)
+                    continue
+
+                error_msg = f"Status {status}: {str(body)[:500]}"
+                print(f"GitHub upload failed for {path}: {error_msg}")
+                return {"success": False, "status": status, "message": error_msg}
+
+        except Exception as e:
+            error_msg = f"Exception: {str(e)}"
+            print(f"Exception uploading {path}: {error_msg}")
+            return {"success": False, "status": 0, "message": error_msg}
+
+    async def delete_file(self, path, sha):
+        """Delete a file from GitHub repository
+
+        Returns:
+            bool: True if deletion successful, False otherwise
+        """
+        url = _repo_url(f"contents/{path}")
+
+        try:
+            for attempt in range(CONFLICT_RETRIES + 1):
+                status, body = await self._request("DELETE", url, json={
+                    "message": f"Delete {path}",
+                    "sha": sha,
+                    "branch": GITHUB_BRANCH
+                })
+
+                if status == 200:
+                    return True
+
+                if status in [409, 422] and attempt < CONFLICT_RETRIES:
+                    sha = await self._current_sha(url)
+                    if sha is None:
+                        return True  # Already gone
+                    await _backoff(attempt + 1)
+                    continue
+
+                print(f"GitHub delete failed for {path}: {status}")
+                return False
+
+        except Exception as e:
+            print(f"Exception deleting {path}: {str(e)}")
+            return False
+
+    # -------------------------------------------------
+    # Git Data API
+    # -------------------------------------------------
+    async def create_blob(self, local_path):
+        """Create a blob from a local file (streamed, see Base64JSONBody) and return its SHA"""
+        blob = await self._check(
+            "POST", _repo_url("git/blobs"), 201,
+            data=Base64JSONBody(local_path, {"encoding": "base64"}),
+            headers={"Content-Type": "application/json"}
+        )
+        return blob["sha"]
+
+    async def commit_entries(self, entries, message):
+        """Commit tree entries on top of GITHUB_BRANCH, rebuilding if the branch moves"""
+        for attempt in range(CONFLICT_RETRIES + 1):
+            ref = await self._check("GET", _repo_url(f"git/ref/heads/{GITHUB_BRANCH}"), 200)
+            head_sha = ref["object"]["sha"]
+            head = await self._check("GET", _repo_url(f"git/commits/{head_sha}"), 200)
+            tree = await self._check("POST", _repo_url("git/trees"), 201, json={
+                "base_tree": head["tree"]["sha"],
+                "tree": entries
+            })
+            commit = await self._check("POST", _repo_url("git/commits"), 201, json={
+                "message": message,
+                "tree": tree["sha"],
+                "parents": [head_sha]
+            })
+            try:
+                await self._check("PATCH", _repo_url(f"git/refs/heads/{GITHUB_BRANCH}"), 200, json={
+                    "sha": commit["sha"]
+                })
+                return commit["sha"]
+            except GitHubError as e:
+                if e.status not in [409, 422] or attempt == CONFLICT_RETRIES:
+                    raise
+                await _backoff(attempt + 1)
+
+    async def batch(self, coroutines, progress_callback=None):
+        """Run coroutines concurrently (bounded by the client semaphore)
+
+        Args:
+            coroutines: dict mapping a key to a coroutine
+            progress_callback: Optional callable(done, total, key) run as each finishes
+
+        Returns:
+            dict: key -> result, or the exception the coroutine raised
+        """
+        async def keyed(key, coroutine):
+            async with self.batch_semaphore:
+                try:
+                    return key, await coroutine
+                except Exception as e:
+                    return key, e
+
+        results = {}
+        tasks = [keyed(key, coroutine) for key, coroutine in coroutines.items()]
+        for done, next_result in enumerate(asyncio.as_completed(tasks), start=1):
+            key, result = await next_result
+            results[key] = result
+            if progress_callback:
+                progress_callback(done, len(tasks), key)
+        return results
+
+
+async def upload_games_async(games, concurrency=ASYNC_CONCURRENCY, progress_callback=None):
+    """Upload many game folders with one event loop and one commit
+
+    Blobs for every file of every game are created concurrently. Games
+    whose blobs all succeeded are then committed together; a game with
+    any failed blob is left out of the commit and reported as failed.
+
+    Args:
+        games: dict mapping slug -> {relative path: local file path}
+        concurrency: Maximum requests in flight
+        progress_callback: Optional callable(done, total, path) run after each blob
+
+    Returns:
+        dict: slug -> {"success": bool, "status": int, "message": str, "files": list, "deleted": list}
+    """
+    async with AsyncGitHubClient(concurrency) as gh:
+        blobs = await gh.batch({
+            f"{slug}/{rel_path}": gh.create_blob(local_path)
+            for slug, files in games.items()
+            for rel_path, local_path in files.items()
+        }, progress_callback)
+
+        results = {}
+        entries = []
+        for slug, files in games.items():
+            paths = [f"{slug}/{rel_path}" for rel_path in files]
+            failed = [path for path in paths if isinstance(blobs[path], Exception)]
+            if failed:
+                error = blobs[failed[0]]
+                results[slug] = {
+                    "success": False,
+                    "status": error.status if isinstance(error, GitHubError) else 0,
+                    "message": f"{len(failed)} of {len(paths)} blob(s) failed, first {failed[0]}: {error}",
+                    "files": failed,
+                    "deleted": []
+                }
+                continue
+            entries += [{"path": path, "mode": "100644", "type": "blob", "sha": blobs[path]} for path in paths]
+            results[slug] = {
+                "success": True,
+                "status": 201,
+                "message": f"Uploaded {len(paths)} file(s)",
+                "files": paths,
+                "deleted": []
+            }
+
+        uploaded = [slug for slug, result in results.items() if result["success"]]
+        if uploaded:
+            try:
+                await gh.commit_entries(entries, f"Upload {len(uploaded)} game(s): {', '.join(uploaded)}")
+            except Exception as e:
+                for slug in uploaded:
+                    results[slug] = {
+                        "success": False,
+                        "status": getattr(e, "status", 0),
+                        "message": f"Commit failed: {e}",
+                        "files": results[slug]["files"],
+                        "deleted": []
+                    }
+
+        return results
@@ -1,5 +1,52 @@
+import asyncio
+import base64
+import json
+import os
+import random
+import threading
+import time
 import requests
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 from settings import *
+from metrics import metrics
+from utils import git_blob_sha
+
+# Overridable to point at a stand-in such as tools/mock_github.py
+API_ROOT = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+# Concurrent blob uploads per game (GitHub recommends keeping this modest)
+UPLOAD_WORKERS = 8
+
+# Keep-alive connections held open to api.github.com (must cover UPLOAD_WORKERS)
+POOL_SIZE = UPLOAD_WORKERS * 2
+
+# Bytes read at a time when streaming base64 request bodies (multiple of 3)
+ENCODE_CHUNK_SIZE = 3 * 64 * 1024
+
+# Seconds to wait for GitHub to accept a connection / send a response
+REQUEST_TIMEOUT = 30
+
+# Below this many remaining requests, spread the rest evenly until the reset
+RATE_LIMIT_PACE_BELOW = 200
+
+# Requests left unused at the end of each rate limit window as a safety margin
+RATE_LIMIT_RESERVE = 10
+
+# Times a single request is re-sent after being rate limited
+RATE_LIMIT_RETRIES = 5
+
+# Times a request is re-sent after a timeout, dropped connection or 5xx
+MAX_RETRIES = 4
+RETRY_STATUSES = {500, 502, 503, 504}
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+# Times a write is re-attempted after losing a race with another commit
+CONFLICT_RETRIES = 3
 
 HEADERS = {
     "Authorization": f"Bearer {GITHUB_TOKEN}",
@@ -7,52 +54,480 @@ HEADERS = {
     "User-Agent": "Brainsta-Admin"
 }
 
-def list_files(path):
-    """List files in a GitHub repository path"""
-    url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/contents/{path}"
-    r = requests.get(url, headers=HEADERS)
-    return r.json() if r.status_code == 200 else []
 
-def upload_file(path, base64_content):
-    """Upload a file to GitHub repository
-    
+class GitHubError(Exception):
+    """Raised by the Git Data API helpers when GitHub rejects a request"""
+
+    def __init__(self, status, message):
+        super().__init__(f"Status {status}: {message}")
+        self.status = status
+
+
+def _repo_url(path):
+    """Build an API URL for a path under the configured repository"""
+    return f"{API_ROOT}/repos/{GITHUB_OWNER}/{GITHUB_REPO}/{path}"
+
+
+def _check(response, *ok):
+    """Return the decoded JSON body, raising GitHubError on unexpected status"""
+    if response.status_code not in ok:
+        raise GitHubError(response.status_code, response.text[:500])
+    return response.json()
+
+
+# =====================================================
+# SHARED HTTP SESSION
+# =====================================================
+class ConnectionStats:
+    """Thread-safe counters of HTTP requests sent and TCP/TLS connections opened"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.opened = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_open(self):
+        with self._lock:
+            self.opened += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "opened": self.opened,
+                "reused": max(0, self.requests - self.opened)
+            }
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report every opened connection to stats"""
+
+    def __init__(self, stats, **kwargs):
+        # HTTPAdapter.__init__ calls init_poolmanager, which needs stats
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+
+        # Count in connect(), not _new_conn(): urllib3 reconnects a pooled
+        # connection object in place when the server has closed its socket
+        class CountingHTTPConnection(HTTPConnection):
+            def connect(self):
+                stats.record_open()
+                return super().connect()
+
+        class CountingHTTPSConnection(HTTPSConnection):
+            def connect(self):
+                stats.record_open()
+                return super().connect()
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = CountingHTTPConnection
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = CountingHTTPSConnection
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool
+        }
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide keep-alive session used for every GitHub call
+
+    The session is created once (under a lock) and shared by all threads;
+    its urllib3 pool hands each worker its own connection.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                stats = ConnectionStats()
+                session = requests.Session()
+                session.headers.update(HEADERS)
+                adapter = _PooledAdapter(stats, pool_connections=4, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.hooks["response"].append(lambda response, *args, **kwargs: stats.record_request())
+                session.stats = stats
+                _session = session
+    return _session
+
+
+def reset_session():
+    """Close the shared session; the next call opens a fresh one"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def connection_stats(since=None):
+    """Return {"requests", "opened", "reused"} for the shared session
+
     Args:
-        path: File path in repository
-        base64_content: Base64 encoded file content
-        
+        since: Optional earlier snapshot; if given, the difference is returned
+
     Returns:
-        dict: {"success": bool, "status": int, "message": str}
+        dict: Request and connection counters
+    """
+    current = get_session().stats.snapshot()
+    if since:
+        return {key: current[key] - since.get(key, 0) for key in current}
+    return current
+
+
+# =====================================================
+# STREAMING REQUEST BODIES
+# =====================================================
+class Base64JSONBody:
+    """JSON request body whose "content" field is a local file, base64 encoded on the fly
+
+    Only one ENCODE_CHUNK_SIZE chunk of the file is in memory at a time,
+    instead of the raw bytes, the base64 bytes, the decoded str and the
+    serialized JSON all at once. The body is re-iterable (each pass
+    reopens the file), so retries can resend it, and its exact length is
+    known up front so requests sends a Content-Length header.
+    """
+
+    def __init__(self, local_path, fields):
+        self.local_path = local_path
+        head = json.dumps(fields)
+        self.prefix = (head[:-1] + (", " if fields else "") + '"content": "').encode()
+        self.suffix = b'"}'
+        self.size = os.path.getsize(local_path)
+
+    def __len__(self):
+        return len(self.prefix) + 4 * ((self.size + 2) // 3) + len(self.suffix)
+
+    def __iter__(self):
+        yield self.prefix
+        with open(self.local_path, "rb") as f:
+            for chunk in iter(lambda: f.read(ENCODE_CHUNK_SIZE), b""):
+                yield base64.b64encode(chunk)
+        yield self.suffix
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        for chunk in self:
+            yield chunk
+
+
+# =====================================================
+# RATE LIMIT GOVERNOR
+# =====================================================
+class RateLimiter:
+    """Paces GitHub requests from every thread using GitHub's rate limit headers
+
+    Tracks X-RateLimit-Remaining / X-RateLimit-Reset from each response and
+    spreads the remaining budget until the reset. When GitHub answers
+    403/429 for a primary or secondary limit, all workers pause until
+    Retry-After (or the reset) and content-creating requests are spaced
+    further apart; the spacing decays again as writes succeed.
+    """
+
+    WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+    def __init__(self, pace_below=RATE_LIMIT_PACE_BELOW, reserve=RATE_LIMIT_RESERVE):
+        self._lock = threading.Lock()
+        self.pace_below = pace_below
+        self.reserve = reserve
+        self.remaining = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.write_interval = 0.0
+        self.penalty = 0.0
+        self.throttled = 0
+        self._next_request = 0.0
+        self._next_write = 0.0
+
+    def _wait_time(self, method, now):
+        """Seconds the caller must still wait; reserves a slot when 0 (lock held)"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+
+        interval = 0.0
+        if self.remaining is not None and now < self.reset_at:
+            if self.remaining <= self.reserve:
+                return self.reset_at - now
+            if self.remaining < self.pace_below:
+                interval = (self.reset_at - now) / (self.remaining - self.reserve)
+
+        wait = self._next_request - now
+        if method in self.WRITE_METHODS:
+            wait = max(wait, self._next_write - now)
+        if wait > 0:
+            return wait
+
+        self._next_request = now + interval
+        if method in self.WRITE_METHODS:
+            self._next_write = now + max(interval, self.write_interval)
+        if self.remaining is not None:
+            self.remaining -= 1
+        return 0.0
+
+    def acquire(self, method):
+        """Block the calling thread until a request may be sent"""
+        while True:
+            with self._lock:
+                wait = self._wait_time(method, time.time())
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, method):
+        """Wait without blocking the event loop until a request may be sent"""
+        while True:
+            with self._lock:
+                wait = self._wait_time(method, time.time())
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def update(self, method, response):
+        """Record rate limit headers from a requests response
+
+        Returns:
+            bool: True if the request was rejected by a rate limit and should be re-sent
+        """
+        return self.record(method, response.status_code, response.headers, response.text)
+
+    def record(self, method, status, headers, text):
+        """Record rate limit headers from any HTTP client's response
+
+        Returns:
+            bool: True if the request was rejected by a rate limit and should be re-sent
+        """
+        now = time.time()
+
+        with self._lock:
+            if "X-RateLimit-Remaining" in headers:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                self.reset_at = float(headers["X-RateLimit-Reset"])
+
+            limited = status == 429 or (
+                status == 403 and (
+                    "Retry-After" in headers
+                    or headers.get("X-RateLimit-Remaining") == "0"
+                    or "rate limit" in text.lower()
+                )
+            )
+
+            if not limited:
+                if method in self.WRITE_METHODS and self.write_interval:
+                    self.write_interval = 0.0 if self.write_interval < 0.05 else self.write_interval * 0.9
+                self.penalty = 0.0
+                return False
+
+            self.throttled += 1
+            if "Retry-After" in headers:
+                pause = float(headers["Retry-After"])
+            elif headers.get("X-RateLimit-Remaining") == "0":
+                pause = max(0.0, self.reset_at - now)
+            else:
+                # Secondary limit without a hint: at least a minute, then doubling
+                self.penalty = min(900.0, max(60.0, self.penalty * 2))
+                pause = self.penalty
+            self.blocked_until = max(self.blocked_until, now + pause)
+            self.write_interval = min(10.0, max(1.0, self.write_interval * 2))
+
+        print(f"GitHub rate limit hit ({status}), pausing {pause:.0f}s")
+        return True
+
+    def status(self):
+        """Return a snapshot of the limiter state"""
+        with self._lock:
+            return {
+                "remaining": self.remaining,
+                "reset_at": self.reset_at,
+                "blocked_for": max(0.0, self.blocked_until - time.time()),
+                "write_interval": self.write_interval,
+                "throttled": self.throttled
+            }
+
+
+rate_limiter = RateLimiter()
+
+
+def _backoff(attempt):
+    """Sleep for a jittered exponential delay before retry number attempt"""
+    time.sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)))
+
+
+def _operation(method, url):
+    """Metrics name of a request, e.g. PUT contents or POST git/blobs"""
+    path = url.split("?", 1)[0].split(f"/repos/{GITHUB_OWNER}/{GITHUB_REPO}/", 1)[-1]
+    parts = path.split("/")
+    return f"{method} {'/'.join(parts[:2]) if parts[0] == 'git' else parts[0]}"
+
+
+def _request(method, url, **kwargs):
+    """Send a request through the shared session
+
+    Paced by rate_limiter; rate-limited requests, timeouts, dropped
+    connections and 5xx responses are re-sent with jittered exponential
+    backoff. Every call is recorded in metrics.
+    """
+    kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+    throttled = failures = 0
+    response = None
+    started = time.perf_counter()
+
+    try:
+        while True:
+            rate_limiter.acquire(method)
+            response = None
+            try:
+                response = get_session().request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if failures >= MAX_RETRIES:
+                    raise
+                failures += 1
+                print(f"GitHub {method} {url} failed ({e}), retry {failures}/{MAX_RETRIES}")
+                _backoff(failures)
+                continue
+
+            if rate_limiter.update(method, response):
+                if throttled >= RATE_LIMIT_RETRIES:
+                    return response
+                throttled += 1
+                continue
+
+            if response.status_code in RETRY_STATUSES and failures < MAX_RETRIES:
+                failures += 1
+                print(f"GitHub {method} {url} returned {response.status_code}, retry {failures}/{MAX_RETRIES}")
+                _backoff(failures)
+                continue
+
+            return response
+
+    finally:
+        metrics.record(
+            "github", _operation(method, url), time.perf_counter() - started,
+            response.status_code if response is not None else 0,
+            sent=int(response.request.headers.get("Content-Length", 0)) if response is not None else 0,
+            received=len(response.content) if response is not None else 0,
+            retries=throttled + failures
+        )
+
+
+def _current_sha(url):
+    """Return the SHA of the file at a contents URL on GITHUB_BRANCH, or None"""
+    response = _request("GET", url, params={"ref": GITHUB_BRANCH})
+    return response.json().get("sha") if response.status_code == 200 else None
+
+
+def _list_tree_entries(tree_ish, prefix):
+    """Return blob entries under tree_ish, descending subtree by subtree"""
+    tree = _check(_request("GET", _repo_url(f"git/trees/{tree_ish}")), 200)
+    blobs = []
+    for entry in tree["tree"]:
+        path = f"{prefix}/{entry['path']}"
+        if entry["type"] == "blob":
+            blobs.append({"path": path, "sha": entry["sha"], "size": entry.get("size", 0)})
+        elif entry["type"] == "tree":
+            blobs.extend(_list_tree_entries(entry["sha"], path))
+    return blobs
+
+
+def list_tree(slug):
+    """List every file under a game folder, including nested folders
+
+    Uses a single recursive Git Trees API call on GITHUB_BRANCH:slug,
+    so nested asset folders are included and the cost does not grow
+    with the number of directories.
+
+    Args:
+        slug: Folder name in repository
+
+    Returns:
+        list: [{"path": str, "sha": str, "size": int}] for every blob, [] if missing
+        or if the listing failed
+    """
+    try:
+        return _list_tree(slug)
+    except Exception as e:
+        print(f"Exception listing tree {slug}: {str(e)}")
+        return []
+
+
+def _list_tree(slug):
+    """list_tree, raising GitHubError (or a network error) instead of returning [] on failure"""
+    tree_ish = quote(f"{GITHUB_BRANCH}:{slug}", safe=":")
+    response = _request("GET", _repo_url(f"git/trees/{tree_ish}"), params={"recursive": "1"})
+    if response.status_code == 404:
+        return []
+    tree = _check(response, 200)
+
+    if tree.get("truncated"):
+        # Response capped by GitHub; fall back to one call per directory
+        print(f"Recursive tree for {slug} truncated, listing per directory")
+        return _list_tree_entries(tree["sha"], slug)
+
+    return [
+        {"path": f"{slug}/{entry['path']}", "sha": entry["sha"], "size": entry.get("size", 0)}
+        for entry in tree["tree"]
+        if entry["type"] == "blob"
+    ]
+
+
+def _put_contents(path, request_kwargs):
+    """PUT a file through the Contents API, retrying with the current SHA on conflict
+
+    request_kwargs(fields) returns the keyword arguments for _request,
+    given the JSON fields other than "content".
     """
-    url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/contents/{path}"
+    url = _repo_url(f"contents/{path}")
     
     try:
         # First, check if file exists and get its SHA
-        get_response = requests.get(url, headers=HEADERS)
-        
-        payload = {
-            "message": f"Add {path}",
-            "content": base64_content,
-            "branch": GITHUB_BRANCH
-        }
-        
-        # If file exists (200), include its SHA for update
-        if get_response.status_code == 200:
-            existing_sha = get_response.json().get("sha")
-            payload["sha"] = existing_sha
-            payload["message"] = f"Update {path}"
-        
-        # Upload/update the file
-        response = requests.put(url, json=payload, headers=HEADERS)
-        
-        # GitHub returns 201 for created, 200 for updated
-        if response.status_code in [200, 201]:
-            action = "Updated" if get_response.status_code == 200 else "Created"
-            return {
-                "success": True,
-                "status": response.status_code,
-                "message": f"{action} successfully"
+        existing_sha = _current_sha(url)
+
+        for attempt in range(CONFLICT_RETRIES + 1):
+            fields = {
+                "message": f"Add {path}",
+                "branch": GITHUB_BRANCH
             }
-        else:
+
+            # If file exists, include its SHA for update
+            if existing_sha:
+                fields["sha"] = existing_sha
+                fields["message"] = f"Update {path}"
+
+            # Upload/update the file
+            response = _request("PUT", url, **request_kwargs(fields))
+
+            # GitHub returns 201 for created, 200 for updated
+            if response.status_code in [200, 201]:
+                action = "Updated" if existing_sha else "Created"
+                return {
+                    "success": True,
+                    "status": response.status_code,
+                    "message": f"{action} successfully"
+                }
+
+            # 409/422: the file changed under us (concurrent commit); re-read its SHA
+            if response.status_code in [409, 422] and attempt < CONFLICT_RETRIES:
+                print(f"SHA conflict uploading {path}, retrying with current SHA")
+                existing_sha = _current_sha(url)
+                _backoff(attempt + 1)
+                continue
+
             error_msg = f"Status {response.status_code}: {response.text[:500]}"
             print(f"GitHub upload failed for {path}: {error_msg}")
             return {
@@ -70,6 +545,36 @@ def upload_file(path, base64_content):
             "message": error_msg
         }
 
+
+def list_files(path):
+    """List files in a GitHub repository path"""
+    url = _repo_url(f"contents/{path}")
+    r = _request("GET", url)
+    return r.json() if r.status_code == 200 else []
+
+
+def stat_file(path):
+    """Return {"path", "sha", "size"} for a file on GITHUB_BRANCH, or None if missing"""
+    response = _request("GET", _repo_url(f"contents/{path}"), params={"ref": GITHUB_BRANCH})
+    if response.status_code != 200 or not isinstance(response.json(), dict):
+        return None
+    data = response.json()
+    return {"path": data["path"], "sha": data["sha"], "size": data.get("size", 0)}
+
+
+def upload_file(path, base64_content):
+    """Upload a file to GitHub repository
+    
+    Args:
+        path: File path in repository
+        base64_content: Base64 encoded file content
+        
+    Returns:
+        dict: {"success": bool, "status": int, "message": str}
+    """
+    return _put_contents(path, lambda fields: {"json": dict(fields, content=base64_content)})
+
+
 def delete_file(path, sha):
     """Delete a file from GitHub repository
     
@@ -80,23 +585,315 @@ def delete_file(path, sha):
     Returns:
         bool: True if deletion successful, False otherwise
     """
-    url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/contents/{path}"
+    url = _repo_url(f"contents/{path}")
     
     try:
-        response = requests.delete(url, json={
-            "message": f"Delete {path}",
-            "sha": sha,
-            "branch": GITHUB_BRANCH
-        }, headers=HEADERS)
-        
-        # GitHub returns 200 for successful deletion
-        if response.status_code == 200:
-            return True
-        else:
+        for attempt in range(CONFLICT_RETRIES + 1):
+            response = _request("DELETE", url, json={
+                "message": f"Delete {path}",
+                "sha": sha,
+                "branch": GITHUB_BRANCH
+            })
+
+            # GitHub returns 200 for successful deletion
+            if response.status_code == 200:
+                return True
+
+            # 409/422: the file changed under us (concurrent commit); re-read its SHA
+            if response.status_code in [409, 422] and attempt < CONFLICT_RETRIES:
+                sha = _current_sha(url)
+                if sha is None:
+                    return True  # Already gone
+                print(f"SHA conflict deleting {path}, retrying with current SHA")
+                _backoff(attempt + 1)
+                continue
+
             print(f"GitHub delete failed for {path}: {response.status_code}")
             print(f"Response: {response.text}")
             return False
             
     except Exception as e:
         print(f"Exception deleting {path}: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+
+# =====================================================
+# GIT DATA API (ONE COMMIT PER GAME)
+# =====================================================
+def _get_head():
+    """Return (commit_sha, tree_sha) of the tip of GITHUB_BRANCH"""
+    ref = _check(_request("GET", _repo_url(f"git/ref/heads/{GITHUB_BRANCH}")), 200)
+    commit_sha = ref["object"]["sha"]
+    commit = _check(_request("GET", _repo_url(f"git/commits/{commit_sha}")), 200)
+    return commit_sha, commit["tree"]["sha"]
+
+
+def _create_blob(local_path):
+    """Create a blob from a local file (streamed, see Base64JSONBody) and return its SHA"""
+    blob = _check(_request(
+        "POST", _repo_url("git/blobs"),
+        data=Base64JSONBody(local_path, {"encoding": "base64"}),
+        headers={"Content-Type": "application/json"}
+    ), 201)
+    return blob["sha"]
+
+
+def _create_tree(entries, base_tree=None):
+    """Create a tree from entries (on top of base_tree if given) and return its SHA"""
+    payload = {"tree": entries}
+    if base_tree:
+        payload["base_tree"] = base_tree
+    tree = _check(_request("POST", _repo_url("git/trees"), json=payload), 201)
+    return tree["sha"]
+
+
+def _commit_tree(tree_sha, parent_sha, message):
+    """Commit tree_sha on top of parent_sha and move GITHUB_BRANCH to it"""
+    commit = _check(_request("POST", _repo_url("git/commits"), json={
+        "message": message,
+        "tree": tree_sha,
+        "parents": [parent_sha]
+    }), 201)
+    _check(_request("PATCH", _repo_url(f"git/refs/heads/{GITHUB_BRANCH}"), json={
+        "sha": commit["sha"]
+    }), 200)
+    return commit["sha"]
+
+
+def _commit_on_head(build_tree, message):
+    """Commit a tree built on the current tip of GITHUB_BRANCH
+
+    build_tree(base_tree_sha) returns the new root tree SHA, or None when
+    there is nothing to commit. If another commit moves the branch before
+    the ref update (422 not a fast forward / 409 conflict), the tree is
+    rebuilt on the new tip and committed again.
+
+    Returns:
+        str: New commit SHA, or None if nothing was committed
+    """
+    for attempt in range(CONFLICT_RETRIES + 1):
+        head_sha, base_tree = _get_head()
+        tree_sha = build_tree(base_tree)
+        if tree_sha is None:
+            return None
+        try:
+            return _commit_tree(tree_sha, head_sha, message)
+        except GitHubError as e:
+            if e.status not in [409, 422] or attempt == CONFLICT_RETRIES:
+                raise
+            print(f"{GITHUB_BRANCH} moved during commit, rebuilding on new head")
+            _backoff(attempt + 1)
+
+
+def upload_blobs(files, max_workers=UPLOAD_WORKERS, progress_callback=None):
+    """Create blobs for many files on a bounded thread pool
+
+    Futures complete on worker threads, but progress_callback is always
+    called from the calling thread, so it may safely update Streamlit
+    elements such as st.progress.
+
+    Args:
+        files: dict mapping repository paths to local file paths
+        max_workers: Maximum number of concurrent uploads
+        progress_callback: Optional callable(done, total, path) run after each file
+
+    Returns:
+        dict: repository path -> completed Future resolving to the blob SHA
+    """
+    total = len(files)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total or 1))) as pool:
+        futures = {
+            github_path: pool.submit(_create_blob, local_path)
+            for github_path, local_path in files.items()
+        }
+        owners = {future: github_path for github_path, future in futures.items()}
+
+        for done, future in enumerate(as_completed(owners), start=1):
+            if progress_callback:
+                progress_callback(done, total, owners[future])
+
+    return futures
+
+
+def _write_tree(slug, uploads, removed, message, max_workers, progress_callback):
+    """Commit uploads (repository path -> local path) and removals in one commit"""
+    paths = list(uploads)
+
+    try:
+        futures = upload_blobs(uploads, max_workers=max_workers, progress_callback=progress_callback)
+
+        failed = [path for path, future in futures.items() if future.exception()]
+        if failed:
+            error = futures[failed[0]].exception()
+            status = error.status if isinstance(error, GitHubError) else 0
+            error_msg = f"{len(failed)} of {len(paths)} blob(s) failed, first {failed[0]}: {error}"
+            print(f"GitHub tree upload failed for {slug}: {error_msg}")
+            return {"success": False, "status": status, "message": error_msg, "files": failed, "deleted": []}
+
+        entries = [{
+            "path": github_path,
+            "mode": "100644",
+            "type": "blob",
+            "sha": future.result()
+        } for github_path, future in futures.items()]
+
+        # A null SHA removes the path from the base tree
+        entries += [{
+            "path": github_path,
+            "mode": "100644",
+            "type": "blob",
+            "sha": None
+        } for github_path in removed]
+
+        _commit_on_head(lambda base_tree: _create_tree(entries, base_tree), message)
+
+        return {
+            "success": True,
+            "status": 201,
+            "message": f"Uploaded {len(paths)} and removed {len(removed)} file(s) in one commit",
+            "files": paths,
+            "deleted": list(removed)
+        }
+
+    except GitHubError as e:
+        print(f"GitHub tree upload failed for {slug}: {e}")
+        return {"success": False, "status": e.status, "message": str(e), "files": paths, "deleted": []}
+
+    except Exception as e:
+        error_msg = f"Exception: {str(e)}"
+        print(f"Exception uploading {slug}: {error_msg}")
+        return {"success": False, "status": 0, "message": error_msg, "files": paths, "deleted": []}
+
+
+def upload_tree(slug, files, message=None, max_workers=UPLOAD_WORKERS, progress_callback=None):
+    """Upload a whole game folder to GitHub as a single commit
+
+    Creates one blob per file, then one tree, one commit and one ref
+    update, instead of a GET + PUT (and a commit) per file.
+
+    Args:
+        slug: Folder name in repository
+        files: dict mapping paths relative to the slug folder to local file paths
+        message: Optional commit message
+        max_workers: Maximum number of concurrent blob uploads
+        progress_callback: Optional callable(done, total, path) run after each blob
+
+    Returns:
+        dict: {"success": bool, "status": int, "message": str, "files": list, "deleted": list}
+    """
+    uploads = {f"{slug}/{rel_path}": local_path for rel_path, local_path in files.items()}
+    return _write_tree(
+        slug, uploads, [],
+        message or f"Upload {slug} ({len(uploads)} files)",
+        max_workers, progress_callback
+    )
+
+
+def sync_tree(slug, files, message=None, max_workers=UPLOAD_WORKERS, progress_callback=None):
+    """Make a game folder on GitHub match local files, uploading only the delta
+
+    Compares local git blob SHAs with the remote tree for the slug, then
+    uploads added or changed files and removes files that no longer exist
+    locally, all in one commit. Nothing is committed if nothing changed.
+
+    Args:
+        slug: Folder name in repository
+        files: dict mapping paths relative to the slug folder to local file paths
+        message: Optional commit message
+        max_workers: Maximum number of concurrent blob uploads
+        progress_callback: Optional callable(done, total, path) run after each blob
+
+    Returns:
+        dict: {"success": bool, "status": int, "message": str,
+               "files": list, "deleted": list, "unchanged": int}
+    """
+    local = {f"{slug}/{rel_path}": local_path for rel_path, local_path in files.items()}
+    try:
+        # An unreadable folder must not look empty: nothing would be removed
+        remote = {entry["path"]: entry["sha"] for entry in _list_tree(slug)}
+    except GitHubError as e:
+        print(f"Listing {slug} failed, not syncing: {str(e)}")
+        return {"success": False, "status": e.status, "message": f"Could not list {slug}: {str(e)}",
+                "files": sorted(local), "deleted": [], "unchanged": 0}
+    except Exception as e:
+        print(f"Listing {slug} failed, not syncing: {str(e)}")
+        return {"success": False, "status": 0, "message": f"Could not list {slug}: {str(e)}",
+                "files": sorted(local), "deleted": [], "unchanged": 0}
+
+    uploads = {
+        github_path: local_path
+        for github_path, local_path in local.items()
+        if remote.get(github_path) != git_blob_sha(local_path)
+    }
+    removed = sorted(set(remote) - set(local))
+    unchanged = len(local) - len(uploads)
+
+    if not uploads and not removed:
+        return {
+            "success": True,
+            "status": 200,
+            "message": f"Already up to date ({unchanged} file(s) unchanged)",
+            "files": [],
+            "deleted": [],
+            "unchanged": unchanged
+        }
+
+    result = _write_tree(
+        slug, uploads, removed,
+        message or f"Update {slug} ({len(uploads)} changed, {len(removed)} removed)",
+        max_workers, progress_callback
+    )
+    result["unchanged"] = unchanged
+    if result["success"]:
+        result["message"] = f"{len(uploads)} changed, {len(removed)} removed, {unchanged} unchanged"
+    return result
+
+
+def delete_tree(slugs, message=None):
+    """Delete whole game folders from GitHub as a single commit
+
+    Reads the root tree once, writes a new root tree without the given
+    folders and commits it, so the cost does not depend on how many
+    files or games are removed.
+
+    Args:
+        slugs: Folder names in repository
+        message: Optional commit message
+
+    Returns:
+        dict: {"success": bool, "status": int, "message": str, "deleted": list}
+    """
+    slugs = set(slugs)
+    deleted = []
+
+    def without_slugs(base_tree):
+        root = _check(_request("GET", _repo_url(f"git/trees/{base_tree}")), 200)
+        deleted[:] = sorted(entry["path"] for entry in root["tree"] if entry["path"] in slugs)
+        if not deleted:
+            return None
+        return _create_tree([{
+            "path": entry["path"],
+            "mode": entry["mode"],
+            "type": entry["type"],
+            "sha": entry["sha"]
+        } for entry in root["tree"] if entry["path"] not in slugs])
+
+    try:
+        if _commit_on_head(without_slugs, message or f"Delete {', '.join(sorted(slugs))}") is None:
+            return {"success": True, "status": 200, "message": "Nothing to delete", "deleted": []}
+
+        return {
+            "success": True,
+            "status": 200,
+            "message": f"Deleted {len(deleted)} folder(s) in one commit",
+            "deleted": deleted
+        }
+
+    except GitHubError as e:
+        print(f"GitHub tree delete failed for {sorted(slugs)}: {e}")
+        return {"success": False, "status": e.status, "message": str(e), "deleted": []}
+
+    except Exception as e:
+        error_msg = f"Exception: {str(e)}"
+        print(f"Exception deleting {sorted(slugs)}: {error_msg}")
+        return {"success": False, "status": 0, "message": error_msg, "deleted": []}
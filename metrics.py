@@ -0,0 +1,274 @@
+import json
+import math
+import threading
+import time
+from collections import Counter, deque
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Recent latencies kept per operation for percentiles
+SAMPLE_SIZE = 512
+
+# Firestore RPCs timed by instrument_firestore
+FIRESTORE_RPCS = (
+    "batch_get_documents", "run_query", "run_aggregation_query", "commit",
+    "begin_transaction", "rollback", "list_documents", "list_collection_ids",
+    "partition_query", "batch_write"
+)
+
+
+def _percentile(ordered, pct):
+    """Nearest-rank percentile of a sorted list, or 0 for an empty one"""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _escape(value):
+    """Escape a Prometheus label value"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class OperationStats:
+    """Running totals for one (service, operation) pair"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.sent = 0
+        self.received = 0
+        self.retries = 0
+        self.statuses = Counter()
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+
+class Metrics:
+    """Process-wide latency, traffic and status aggregates per remote operation
+
+    Shared by every Streamlit session in the process, so the admin panel
+    shows production traffic rather than one user's clicks.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}
+        self.started_at = time.time()
+
+    def record(self, service, operation, seconds, status, sent=0, received=0, retries=0):
+        """Record one completed operation
+
+        Args:
+            service: "github" or "firestore"
+            operation: Endpoint or RPC name, e.g. "PUT contents"
+            seconds: Wall time including retries and rate-limit waits
+            status: Final HTTP status code, 0 if no response was received
+            sent: Request bytes
+            received: Response bytes
+            retries: Times the request was re-sent
+        """
+        with self._lock:
+            stats = self._ops.get((service, operation))
+            if stats is None:
+                stats = self._ops[(service, operation)] = OperationStats()
+            stats.count += 1
+            stats.errors += status == 0 or status >= 400
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.sent += sent
+            stats.received += received
+            stats.retries += retries
+            stats.statuses[status] += 1
+            stats.samples.append(seconds)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+                    break
+
+    def snapshot(self):
+        """Return one dict per operation, slowest total time first"""
+        with self._lock:
+            rows = []
+            for (service, operation), stats in self._ops.items():
+                samples = sorted(stats.samples)
+                rows.append({
+                    "service": service,
+                    "operation": operation,
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "total_s": round(stats.seconds, 3),
+                    "mean_ms": round(stats.seconds / stats.count * 1000, 1),
+                    "p50_ms": round(_percentile(samples, 50) * 1000, 1),
+                    "p95_ms": round(_percentile(samples, 95) * 1000, 1),
+                    "max_ms": round(stats.max_seconds * 1000, 1),
+                    "sent_bytes": stats.sent,
+                    "received_bytes": stats.received,
+                    "statuses": {str(status): n for status, n in sorted(stats.statuses.items())}
+                })
+        return sorted(rows, key=lambda row: row["total_s"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._ops = {}
+            self.started_at = time.time()
+
+    def to_json(self):
+        """Aggregates as a JSON document"""
+        return json.dumps({"since": self.started_at, "operations": self.snapshot()}, indent=2)
+
+    def to_prometheus(self):
+        """Aggregates in the Prometheus text exposition format"""
+        def labels(service, operation, **extra):
+            pairs = {"service": service, "operation": operation, **extra}
+            return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs.items()) + "}"
+
+        with self._lock:
+            ops = sorted(self._ops.items())
+
+            def family(name, kind, help_text, samples):
+                lines.append(f"# HELP brainsta_{name} {help_text}")
+                lines.append(f"# TYPE brainsta_{name} {kind}")
+                for (service, operation), stats in ops:
+                    for suffix, extra, value in samples(stats):
+                        lines.append(f"brainsta_{name}{suffix}{labels(service, operation, **extra)} {value}")
+
+            def histogram(stats):
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, stats.buckets):
+                    cumulative += n
+                    yield "_bucket", {"le": bound}, cumulative
+                yield "_bucket", {"le": "+Inf"}, stats.count
+                yield "_sum", {}, f"{stats.seconds:.6f}"
+                yield "_count", {}, stats.count
+
+            lines = []
+            family("requests_total", "counter", "Remote operations by final status",
+                   lambda stats: [("", {"status": status}, n) for status, n in sorted(stats.statuses.items())])
+            family("request_retries_total", "counter", "Re-sent requests",
+                   lambda stats: [("", {}, stats.retries)])
+            family("request_sent_bytes_total", "counter", "Request bytes",
+                   lambda stats: [("", {}, stats.sent)])
+            family("request_received_bytes_total", "counter", "Response bytes",
+                   lambda stats: [("", {}, stats.received)])
+            family("request_duration_seconds", "histogram", "Operation wall time", histogram)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+# -------------------------------------------------
+# Firestore
+# -------------------------------------------------
+def _message_size(message):
+    """Serialized size of a proto-plus message, 0 if unknown"""
+    try:
+        return type(message).pb(message).ByteSize()
+    except Exception:
+        return 0
+
+
+def _status_of(error):
+    """HTTP-style status of a google.api_core error, 0 for anything else"""
+    code = getattr(error, "code", 0)
+    return code if isinstance(code, int) else 0
+
+
+def _timed_rpc(name, method, request_type):
+    """Wrap one GAPIC Firestore method so every call is recorded in metrics"""
+    def call(*args, **kwargs):
+        request = kwargs.get("request", args[0] if args else None)
+        sent = 0
+        if request is not None and request_type is not None:
+            sent = _message_size(request if isinstance(request, request_type) else request_type(request))
+
+        started = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except Exception as e:
+            metrics.record("firestore", name, time.perf_counter() - started, _status_of(e), sent=sent)
+            raise
+
+        if not name.startswith(("batch_get", "run_")):
+            metrics.record("firestore", name, time.perf_counter() - started, 200,
+                           sent=sent, received=_message_size(result))
+            return result
+
+        # Server-streaming RPC: record once the caller has drained (or dropped) the stream
+        def stream():
+            received, status = 0, 200
+            try:
+                for response in result:
+                    received += _message_size(response)
+                    yield response
+            except Exception as e:
+                status = _status_of(e)
+                raise
+            finally:
+                metrics.record("firestore", name, time.perf_counter() - started, status,
+                               sent=sent, received=received)
+
+        return stream()
+
+    return call
+
+
+def instrument_firestore(client):
+    """Record latency, bytes and status of every RPC a Firestore client makes
+
+    Wraps the client's underlying GAPIC methods, so documents, queries,
+    aggregations, batches and transactions are all covered without
+    changing any call sites.
+
+    Args:
+        client: google.cloud.firestore.Client
+
+    Returns:
+        The same client
+    """
+    from google.cloud.firestore_v1 import types
+
+    api = client._firestore_api
+    for name in FIRESTORE_RPCS:
+        method = getattr(api, name, None)
+        if method is None or getattr(method, "_instrumented", False):
+            continue
+        request_type = getattr(types, "".join(part.title() for part in name.split("_")) + "Request", None)
+        wrapped = _timed_rpc(name, method, request_type)
+        wrapped._instrumented = True
+        setattr(api, name, wrapped)
+    return client
+
+
+# -------------------------------------------------
+# Admin panel
+# -------------------------------------------------
+def render_metrics_panel():
+    """Show the aggregates with JSON/Prometheus downloads (call inside an expander)"""
+    import streamlit as st
+
+    rows = metrics.snapshot()
+    if not rows:
+        st.info("No GitHub or Firestore requests recorded yet")
+        return
+
+    st.caption(f"Since {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(metrics.started_at))}, all sessions of this process")
+    st.dataframe(
+        [{key: value for key, value in row.items() if key != "statuses"} for row in rows],
+        use_container_width=True,
+        hide_index=True
+    )
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("⬇️ JSON", metrics.to_json(), file_name="metrics.json", mime="application/json")
+    with col2:
+        st.download_button("⬇️ Prometheus", metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+    with col3:
+        if st.button("♻️ Reset metrics"):
+            metrics.reset()
+            st.rerun()
@@ -0,0 +1,48 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from catalog import created_at, normalize_title
+from utils import slugify
+
+# Fields the Manage Games list reads; list queries project to these
+LIST_FIELDS = ["title", "slug", "categoryId", "published", "url"]
+
+# Fields a full in-memory game list needs (adds duplicate checks and ordering)
+GAME_FIELDS = LIST_FIELDS + ["titleNormalized", "createdAt"]
+
+
+@dataclass(frozen=True, slots=True)
+class Game:
+    """One game, converted from its snapshot once
+
+    Caches and the live index hold these instead of DocumentSnapshots,
+    so search, stats and rendering read plain attributes rather than
+    calling to_dict() per game per rerun. Built from a full or projected
+    snapshot: missing fields fall back to values derived from the ones
+    present.
+    """
+
+    id: str
+    title: str
+    titleNormalized: str
+    slug: str
+    categoryId: Optional[str]
+    url: str
+    published: bool
+    createdAt: Optional[datetime]
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        data = snapshot.to_dict() or {}
+        title = data.get("title", "")
+        return cls(
+            id=snapshot.id,
+            title=title,
+            titleNormalized=data.get("titleNormalized") or normalize_title(title),
+            slug=data.get("slug") or slugify(title),
+            categoryId=data.get("categoryId"),
+            url=data.get("url", ""),
+            published=data.get("published", False),
+            createdAt=created_at(snapshot)
+        )
@@ -0,0 +1,313 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from catalog import normalize_title
+
+# Lengths of the substrings indexed in the postings; shorter queries scan the keys
+NGRAM_SIZES = (2, 3)
+
+# Changed games above which the prefix array is re-sorted instead of patched
+RESORT_THRESHOLD = 64
+
+# Ranks, best first; fuzzy matches rank SUBSTRING + their edit distance
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+# Largest edit distance fuzzy search allows (for queries over 5 characters)
+MAX_TYPOS = 2
+
+# Prefix array entry kinds
+WHOLE, WORD = 0, 1
+
+_WORD_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def ngrams(text, n):
+    """Return the set of length-n substrings of text"""
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _grams(text):
+    return set().union(*(ngrams(text, n) for n in NGRAM_SIZES))
+
+
+def _fuzzy_grams(text):
+    # Padded so the first and last letters count as much as the middle ones
+    return ngrams(f"$${text}$", 3)
+
+
+def max_typos(query):
+    """Edit distance fuzzy search allows for a query: 0 up to 2 characters, 1 up to 5, then 2"""
+    if len(query) < 3:
+        return 0
+    return 1 if len(query) <= 5 else MAX_TYPOS
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 as soon as it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+def _terms(game):
+    """Prefix array terms for a game: whole title and slug, then each title word"""
+    terms = {(game.titleNormalized, WHOLE), (game.slug, WHOLE)}
+    for word in _WORD_SPLIT.split(game.titleNormalized):
+        if word:
+            terms.add((word, WORD))
+    return terms
+
+
+def _same(a, b):
+    return a is b or a == b
+
+
+class SearchIndex:
+    """Substring and prefix search over game titles and slugs
+
+    Keeps bigram and trigram postings (n-gram -> game ids) over the
+    normalized title and slug, plus a sorted prefix array of titles, slugs
+    and title words. A two or three letter query is answered by its own
+    posting; a longer one intersects its trigrams to a short candidate
+    list that is then checked with `in`. The prefix array gives prefix
+    matches by bisection, so a search no longer lowercases and scans every
+    game.
+
+    Results are ranked exact match, then title/slug prefix, then word
+    prefix, then substring; ties keep the order of the synced list
+    (newest first).
+
+    With fuzzy=True, search() also returns games whose title, slug or a
+    title word is within max_typos(query) edits of the query (per word for
+    multi-word queries), ranked after the exact matches by distance. Padded trigram postings over the
+    distinct terms narrow those to the few terms that share enough
+    trigrams to be that close (each edit breaks at most three), and only
+    they get a bounded Levenshtein check.
+
+    sync() only re-indexes games that were added, changed or removed, so
+    it can be called on every rerun with the current cached list.
+
+    Usage:
+        index = SearchIndex()
+        index.sync(all_games)
+        games = index.search("fillo")
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._games = {}  # game id -> Game
+        self._keys = {}  # game id -> (normalized title, slug)
+        self._terms = {}  # game id -> prefix array entries
+        self._postings = defaultdict(set)  # n-gram -> game ids
+        self._prefixes = []  # sorted (term, kind, game id)
+        self._term_games = defaultdict(set)  # term -> game ids
+        self._fuzzy_postings = defaultdict(set)  # padded trigram -> terms
+        self._order = {}  # game id -> position in the synced list
+        self._source = None
+        self.version = 0
+
+    def __len__(self):
+        return len(self._games)
+
+    def sync(self, games):
+        """Bring the index in line with games, re-indexing only what changed
+
+        Args:
+            games: List of Game records in display order
+
+        Returns:
+            int: Number of games added, changed or removed
+        """
+        with self._lock:
+            # Cached lists are shared and rebuilt on change, so identity means unchanged
+            if games is self._source:
+                return 0
+            current = {g.id: g for g in games}
+            # Unchanged games are usually the same object, so try `is` before ==
+            stale = [gid for gid, g in self._games.items() if not _same(current.get(gid), g)]
+            fresh = [g for gid, g in current.items() if not _same(self._games.get(gid), g)]
+            resort = len(stale) + len(fresh) > RESORT_THRESHOLD
+
+            for gid in stale:
+                self._remove(gid, patch_prefixes=not resort)
+            for game in fresh:
+                self._add(game, patch_prefixes=not resort)
+            if resort:
+                self._prefixes = sorted(
+                    (term, kind, gid) for gid, terms in self._terms.items() for term, kind in terms
+                )
+
+            self._order = {g.id: i for i, g in enumerate(games)}
+            self._source = games
+            if stale or fresh:
+                self.version += 1
+            return len(set(stale) | {g.id for g in fresh})
+
+    def _add(self, game, patch_prefixes):
+        title, slug = game.titleNormalized, game.slug
+        self._games[game.id] = game
+        self._keys[game.id] = (title, slug)
+        for gram in _grams(title) | _grams(slug):
+            self._postings[gram].add(game.id)
+        terms = _terms(game)
+        self._terms[game.id] = terms
+        for term in {term for term, _ in terms}:
+            if not self._term_games[term]:
+                for gram in _fuzzy_grams(term):
+                    self._fuzzy_postings[gram].add(term)
+            self._term_games[term].add(game.id)
+        if patch_prefixes:
+            for term, kind in terms:
+                insort(self._prefixes, (term, kind, game.id))
+
+    def _remove(self, game_id, patch_prefixes):
+        title, slug = self._keys.pop(game_id)
+        del self._games[game_id]
+        for gram in _grams(title) | _grams(slug):
+            ids = self._postings[gram]
+            ids.discard(game_id)
+            if not ids:
+                del self._postings[gram]
+        terms = self._terms.pop(game_id)
+        for term in {term for term, _ in terms}:
+            ids = self._term_games[term]
+            ids.discard(game_id)
+            if not ids:
+                del self._term_games[term]
+                for gram in _fuzzy_grams(term):
+                    self._fuzzy_postings[gram].discard(term)
+                    if not self._fuzzy_postings[gram]:
+                        del self._fuzzy_postings[gram]
+        if patch_prefixes:
+            for term, kind in terms:
+                i = bisect_left(self._prefixes, (term, kind, game_id))
+                del self._prefixes[i]
+
+    def _candidates(self, query):
+        """Game ids that may contain query, from the postings when it is long enough
+
+        Returns:
+            tuple: (ids, exact) where exact means every id is known to match
+        """
+        if len(query) < NGRAM_SIZES[0]:
+            return self._keys.keys(), False
+        if len(query) in NGRAM_SIZES:
+            return self._postings.get(query, ()), True
+        postings = sorted((self._postings.get(gram, set()) for gram in ngrams(query, NGRAM_SIZES[-1])), key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            if not candidates:
+                break
+            candidates &= ids
+        return candidates, False
+
+    def _fuzzy_terms(self, query, max_distance):
+        """Return {term: edit distance} for indexed terms within max_distance of query"""
+        grams = _fuzzy_grams(query)
+        # q-gram lemma: each edit removes at most three of the query's trigrams
+        needed = max(1, len(grams) - 3 * max_distance)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._fuzzy_postings.get(gram, ()))
+        matches = {}
+        for term, count in shared.items():
+            if count >= needed:
+                distance = edit_distance(query, term, max_distance)
+                if distance <= max_distance:
+                    matches[term] = distance
+        return matches
+
+    def _fuzzy_games(self, query):
+        """Return {game id: edit distance} for games within a few typos of query
+
+        A multi-word query also matches games where every query word is
+        within its own typo budget of some title word, so word order and
+        extra words in the title don't matter.
+        """
+        def games_near(text):
+            found = {}
+            for term, distance in self._fuzzy_terms(text, max_typos(text)).items():
+                for gid in self._term_games[term]:
+                    found[gid] = min(distance, found.get(gid, distance))
+            return found
+
+        matches = games_near(query)
+        words = [word for word in _WORD_SPLIT.split(query) if word]
+        if len(words) > 1:
+            per_word = [games_near(word) for word in words]
+            for gid in set(per_word[0]).intersection(*per_word[1:]):
+                distance = min(MAX_TYPOS, sum(found[gid] for found in per_word))
+                matches[gid] = min(distance, matches.get(gid, distance))
+        return matches
+
+    def search(self, query, limit=None, fuzzy=False):
+        """Return games whose title or slug contains query, best match first
+
+        Args:
+            query: Raw search box text
+            limit: Optional maximum number of results
+            fuzzy: Also return games within a few typos of query
+
+        Returns:
+            list: Game records
+        """
+        query = normalize_title(query)
+        if not query:
+            return []
+        with self._lock:
+            ranks = {}
+            # Prefix matches straight from the sorted array
+            i = bisect_left(self._prefixes, (query,))
+            while i < len(self._prefixes) and self._prefixes[i][0].startswith(query):
+                term, kind, gid = self._prefixes[i]
+                if kind == WORD:
+                    rank = WORD_PREFIX
+                else:
+                    rank = EXACT if term == query else PREFIX
+                ranks[gid] = min(rank, ranks.get(gid, SUBSTRING))
+                i += 1
+
+            candidates, exact = self._candidates(query)
+            for gid in candidates:
+                if gid not in ranks:
+                    if not exact:
+                        title, slug = self._keys[gid]
+                        if query not in title and query not in slug:
+                            continue
+                    ranks[gid] = SUBSTRING
+
+            if fuzzy:
+                for gid, distance in self._fuzzy_games(query).items():
+                    ranks[gid] = min(ranks.get(gid, SUBSTRING + distance), SUBSTRING + distance)
+
+            buckets = [[] for _ in range(SUBSTRING + MAX_TYPOS + 1)]
+            for gid, rank in ranks.items():
+                buckets[rank].append(gid)
+            ordered = []
+            for bucket in buckets:
+                ordered.extend(sorted(bucket, key=self._order.__getitem__))
+                if limit is not None and len(ordered) >= limit:
+                    ordered = ordered[:limit]
+                    break
+            return [self._games[gid] for gid in ordered]
+
+    def stats(self):
+        """Return index sizes"""
+        with self._lock:
+            return {
+                "games": len(self._games),
+                "ngrams": len(self._postings),
+                "prefixes": len(self._prefixes),
+                "terms": len(self._term_games),
+                "version": self.version
+            }
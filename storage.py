@@ -0,0 +1,197 @@
+import asyncio
+import os
+import shutil
+from abc import ABC, abstractmethod
+
+import settings
+from utils import collect_files, git_blob_sha
+
+# Which backend get_storage() returns: "github" (default) or "local"
+STORAGE_BACKEND = getattr(settings, "STORAGE_BACKEND", "github")
+
+# Root folder and public URL of the local backend
+LOCAL_STORAGE_DIR = getattr(settings, "LOCAL_STORAGE_DIR", "site")
+LOCAL_STORAGE_URL = getattr(settings, "LOCAL_STORAGE_URL", "")
+
+
+class StorageBackend(ABC):
+    """Where game folders are hosted
+
+    Every backend stores a game as <slug>/<relative path> and serves it
+    under base_url, so a game's URL is the same shape whatever the
+    backend. Results use the same dicts as github_utils.
+    """
+
+    base_url = ""
+
+    def url_for(self, slug):
+        """Public URL of a game's entry page"""
+        return f"{self.base_url}/{slug}/index.html"
+
+    @abstractmethod
+    def list(self, slug):
+        """List every file under a game folder
+
+        Returns:
+            list: [{"path": str, "sha": str, "size": int}], [] if missing
+        """
+
+    @abstractmethod
+    def put_many(self, slug, files, replace=False, progress_callback=None):
+        """Store a game folder
+
+        Args:
+            slug: Game folder name
+            files: dict mapping paths relative to the slug folder to local file paths
+            replace: If True, make the folder match files exactly, writing only changes
+            progress_callback: Optional callable(done, total, path) run after each file
+
+        Returns:
+            dict: {"success": bool, "status": int, "message": str, "files": list, "deleted": list}
+            where "files" lists the paths written, or on failure the paths not stored
+        """
+
+    @abstractmethod
+    def delete_many(self, slugs):
+        """Delete whole game folders
+
+        Returns:
+            dict: {"success": bool, "status": int, "message": str, "deleted": list}
+        """
+
+    @abstractmethod
+    def stat(self, path):
+        """Return {"path", "sha", "size"} for one stored file, or None if missing"""
+
+    def put_games(self, games, progress_callback=None):
+        """Store many game folders
+
+        Args:
+            games: dict mapping slug -> {relative path: local file path}
+            progress_callback: Optional callable(done, total, path) run after each file
+
+        Returns:
+            dict: slug -> put_many result
+        """
+        total = sum(len(files) for files in games.values())
+        offset = 0
+        results = {}
+        for slug, files in games.items():
+            def game_progress(done, _, path, offset=offset):
+                if progress_callback:
+                    progress_callback(offset + done, total, path)
+
+            results[slug] = self.put_many(slug, files, progress_callback=game_progress)
+            offset += len(files)
+        return results
+
+
+class GitHubStorage(StorageBackend):
+    """Games hosted in the GitHub repository configured in settings"""
+
+    def __init__(self):
+        import github_utils
+        self.gh = github_utils
+        self.base_url = settings.BASE_URL
+
+    def list(self, slug):
+        return self.gh.list_tree(slug)
+
+    def put_many(self, slug, files, replace=False, progress_callback=None):
+        if replace:
+            return self.gh.sync_tree(slug, files, progress_callback=progress_callback)
+        return self.gh.upload_tree(slug, files, progress_callback=progress_callback)
+
+    def delete_many(self, slugs):
+        return self.gh.delete_tree(slugs)
+
+    def stat(self, path):
+        return self.gh.stat_file(path)
+
+    def put_games(self, games, progress_callback=None):
+        # One event loop and one commit for the whole batch
+        from github_async import upload_games_async
+        return asyncio.run(upload_games_async(games, progress_callback=progress_callback))
+
+
+class LocalStorage(StorageBackend):
+    """Games stored in a local directory with the same layout as the GitHub repo
+
+    Serve root with any static file server at base_url. Useful as a
+    zero-latency baseline when profiling the upload pipeline, and for
+    staging environments.
+    """
+
+    def __init__(self, root=LOCAL_STORAGE_DIR, base_url=LOCAL_STORAGE_URL):
+        self.root = root
+        self.base_url = base_url or f"file://{os.path.abspath(root)}"
+        os.makedirs(root, exist_ok=True)
+
+    def _local(self, path):
+        return os.path.join(self.root, *path.split("/"))
+
+    def list(self, slug):
+        return [
+            self.stat(f"{slug}/{rel_path}")
+            for rel_path in sorted(collect_files(self._local(slug)))
+        ]
+
+    def put_many(self, slug, files, replace=False, progress_callback=None):
+        existing = {entry["path"]: entry["sha"] for entry in self.list(slug)} if replace else {}
+        wanted = {f"{slug}/{rel_path}": local_path for rel_path, local_path in files.items()}
+        written = []
+        stored = set()  # written or already up to date
+
+        try:
+            for done, (path, local_path) in enumerate(wanted.items(), start=1):
+                if not replace or existing.get(path) != git_blob_sha(local_path):
+                    target = self._local(path)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copyfile(local_path, target)
+                    written.append(path)
+                stored.add(path)
+                if progress_callback:
+                    progress_callback(done, len(wanted), path)
+
+            removed = sorted(set(existing) - set(wanted))
+            for path in removed:
+                os.remove(self._local(path))
+
+            return {
+                "success": True,
+                "status": 201,
+                "message": f"Wrote {len(written)} and removed {len(removed)} file(s)",
+                "files": written,
+                "deleted": removed
+            }
+
+        except OSError as e:
+            # Like the GitHub backend, report the paths that did not make it
+            failed = [path for path in wanted if path not in stored]
+            return {"success": False, "status": 0, "message": f"Exception: {str(e)}", "files": failed, "deleted": []}
+
+    def delete_many(self, slugs):
+        deleted = sorted(slug for slug in set(slugs) if os.path.isdir(self._local(slug)))
+        try:
+            for slug in deleted:
+                shutil.rmtree(self._local(slug))
+        except OSError as e:
+            return {"success": False, "status": 0, "message": f"Exception: {str(e)}", "deleted": []}
+        return {"success": True, "status": 200, "message": f"Deleted {len(deleted)} folder(s)", "deleted": deleted}
+
+    def stat(self, path):
+        local_path = self._local(path)
+        if not os.path.isfile(local_path):
+            return None
+        return {"path": path, "sha": git_blob_sha(local_path), "size": os.path.getsize(local_path)}
+
+
+_storage = None
+
+
+def get_storage():
+    """Return the process-wide backend selected by settings.STORAGE_BACKEND"""
+    global _storage
+    if _storage is None:
+        _storage = LocalStorage() if STORAGE_BACKEND == "local" else GitHubStorage()
+    return _storage
@@ -0,0 +1,122 @@
+"""Search benchmark: SearchIndex against the linear title/slug scan
+
+Builds a synthetic catalog of Game records, then reports the index
+build time, the cost of an incremental sync after a few edits, and
+per-query latency of SearchIndex.search next to the scan the apps used
+to run on every rerun. Fuzzy queries are compared with a brute-force
+Levenshtein pass over every game.
+
+Run from the repository root:
+    python -m tools.bench_search
+    python -m tools.bench_search --games 50000 --changes 10 --repeat 50
+
+No Firestore access is needed.
+"""
+import argparse
+import dataclasses
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from models import Game
+from search_index import SearchIndex, edit_distance, max_typos, _terms
+from utils import slugify
+
+WORDS = [
+    "sudoku", "fillomino", "futoshiki", "kakuro", "nonogram", "tectonic", "hitori",
+    "slitherlink", "masyu", "kenken", "star", "battle", "mini", "daily", "classic",
+    "jigsaw", "killer", "hex", "tiles", "bridges", "lights", "out", "mosaic", "word"
+]
+
+SYLLABLES = ["ka", "ro", "mi", "no", "shi", "fu", "to", "lo", "ten", "gu", "ra", "zu", "bel", "tor", "qui", "ve"]
+
+QUERIES = ["su", "fillo", "futoshiki", "killer sudoku", "tect", "ku", "zzz", "mini-star"]
+
+FUZZY_QUERIES = ["filomino", "futoshki", "fillominno", "killer sudku", "tectnic", "kakro"]
+
+
+def make_games(count, seed=0):
+    """Return count synthetic games, newest first"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    games = []
+    for i in range(count):
+        # A made-up name keeps titles as varied as a real catalog's
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        title = " ".join([name] + [rng.choice(WORDS) for _ in range(rng.randint(0, 2))]).title()
+        games.append(Game(
+            id=f"g{i}",
+            title=title,
+            titleNormalized=title.lower(),
+            slug=slugify(title),
+            categoryId=f"c{i % 12}",
+            url=f"https://example.test/{i}/",
+            published=i % 5 != 0,
+            createdAt=start + timedelta(seconds=i)
+        ))
+    games.reverse()
+    return games
+
+
+def linear_search(games, search):
+    """The scan the apps ran before SearchIndex"""
+    return [
+        g for g in games
+        if search.lower() in g.title.lower()
+        or search.lower() in g.slug.lower()
+    ]
+
+
+def brute_force_fuzzy(games, search):
+    """Every game with a title, slug or title word within max_typos edits of search"""
+    limit = max_typos(search)
+    return [
+        g for g in games
+        if any(edit_distance(search, term, limit) <= limit for term, _ in _terms(g))
+    ]
+
+
+def timed(fn, repeat):
+    """Run fn repeat times and return (last result, mean ms)"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SearchIndex against a linear scan")
+    parser.add_argument("--games", type=int, default=50000)
+    parser.add_argument("--changes", type=int, default=10, help="games edited before the incremental sync")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    games = make_games(args.games)
+    index = SearchIndex()
+    _, build_ms = timed(lambda: index.sync(games), 1)
+    print(f"{args.games} games: build {build_ms:.0f} ms, {index.stats()}")
+
+    edited = list(games)
+    for i in random.Random(1).sample(range(len(edited)), args.changes):
+        edited[i] = dataclasses.replace(edited[i], title=edited[i].title + " Deluxe",
+                                        titleNormalized=edited[i].titleNormalized + " deluxe")
+    changed, sync_ms = timed(lambda: index.sync(edited), 1)
+    print(f"incremental sync of {changed} changed game(s): {sync_ms:.1f} ms")
+
+    print(f"\n{'query':<16}{'matches':>9}{'scan ms':>10}{'index ms':>10}{'speedup':>9}")
+    for query in QUERIES:
+        expected, scan_ms = timed(lambda: linear_search(edited, query), args.repeat)
+        found, index_ms = timed(lambda: index.search(query), args.repeat)
+        assert {g.id for g in found} == {g.id for g in expected}, query
+        print(f"{query:<16}{len(found):>9}{scan_ms:>10.2f}{index_ms:>10.2f}{scan_ms / index_ms:>8.1f}x")
+
+    print(f"\n{'fuzzy query':<16}{'matches':>9}{'brute ms':>10}{'index ms':>10}{'speedup':>9}")
+    for query in FUZZY_QUERIES:
+        expected, brute_ms = timed(lambda: brute_force_fuzzy(edited, query), 1)
+        found, index_ms = timed(lambda: index.search(query, fuzzy=True), args.repeat)
+        assert {g.id for g in found} >= {g.id for g in expected}, query
+        print(f"{query:<16}{len(found):>9}{brute_ms:>10.1f}{index_ms:>10.2f}{brute_ms / index_ms:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Upload throughput benchmark against the mock GitHub API
+
+Replays the game ZIPs under tmp/ through the real upload code paths
+(github_utils.upload_tree and github_async.upload_games_async) against
+tools/mock_github.py, and reports files/s, API requests per game and
+p50/p95 upload time per game for each concurrency setting.
+
+Run from the repository root:
+    python -m tools.bench_upload
+    python -m tools.bench_upload --workers 1,4,8,16 --latency 0.08 --error-rate 0.02
+    python -m tools.bench_upload --mode async --workers 16,32,64 --zips tmp/tectonic.zip
+
+Every run gets a fresh mock server, so results do not depend on earlier
+runs. No real GitHub credentials are needed.
+"""
+import argparse
+import asyncio
+import glob
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+import zipfile
+
+from tools.mock_github import MockGitHub
+
+try:
+    import settings
+except ImportError:
+    # Benchmarks only talk to the mock, so placeholder settings are enough
+    settings = types.ModuleType("settings")
+    settings.GITHUB_TOKEN = "mock"
+    settings.GITHUB_OWNER = "mock"
+    settings.GITHUB_REPO = "games"
+    settings.GITHUB_BRANCH = "main"
+    settings.BASE_URL = "http://127.0.0.1"
+    sys.modules["settings"] = settings
+
+import github_utils
+from github_async import upload_games_async
+from utils import collect_files
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values, or 0 for an empty list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def extract_games(zip_paths, work_dir):
+    """Extract each ZIP the way the admin apps do
+
+    Returns:
+        dict: slug -> {relative path: local file path}
+    """
+    games = {}
+    for zip_path in zip_paths:
+        slug = os.path.splitext(os.path.basename(zip_path))[0]
+        game_dir = os.path.join(work_dir, slug)
+        with zipfile.ZipFile(zip_path) as z:
+            z.extractall(game_dir)
+        items = os.listdir(game_dir)
+        if len(items) == 1 and os.path.isdir(os.path.join(game_dir, items[0])):
+            game_dir = os.path.join(game_dir, items[0])
+        files = collect_files(game_dir)
+        if files:
+            games[slug] = files
+    return games
+
+
+def start_mock(args):
+    server = MockGitHub(
+        branch=settings.GITHUB_BRANCH, latency=args.latency, rate_limit=args.rate_limit,
+        window=args.window, write_rate=args.write_rate, error_rate=args.error_rate
+    ).start()
+    github_utils.API_ROOT = server.url
+    github_utils.reset_session()
+    return server
+
+
+def run_sync(games, workers, args):
+    """Upload games one after another with upload_tree, as app.py and multiapp.py do"""
+    server = start_mock(args)
+    times, requests, failed = [], [], 0
+    try:
+        started = time.perf_counter()
+        for slug, files in games.items():
+            before = server.stats()["requests"]
+            t0 = time.perf_counter()
+            result = github_utils.upload_tree(slug, files, max_workers=workers)
+            times.append(time.perf_counter() - t0)
+            requests.append(server.stats()["requests"] - before)
+            failed += not result["success"]
+        elapsed = time.perf_counter() - started
+        return elapsed, times, requests, failed, server.stats()
+    finally:
+        server.stop()
+
+
+def run_async(games, workers, args):
+    """Upload all games in one batch with upload_games_async, as chached-app.py does"""
+    server = start_mock(args)
+    try:
+        started = time.perf_counter()
+        results = asyncio.run(upload_games_async(games, concurrency=workers))
+        elapsed = time.perf_counter() - started
+        stats = server.stats()
+        failed = sum(not result["success"] for result in results.values())
+        # One batch: per-game time is not observable, so report the batch time
+        return elapsed, [elapsed], [stats["requests"] / len(games)], failed, stats
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark game uploads against the mock GitHub API")
+    parser.add_argument("--zips", nargs="*", default=sorted(glob.glob("tmp/*.zip")))
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    parser.add_argument("--workers", default="1,4,8,16", help="comma separated concurrency levels")
+    parser.add_argument("--latency", type=float, default=0.05, help="mean seconds per mock request")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per window, 0 = unlimited")
+    parser.add_argument("--window", type=int, default=60, help="rate limit window in seconds")
+    parser.add_argument("--write-rate", type=int, default=0, help="writes per second, 0 = unlimited")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 5xx")
+    args = parser.parse_args()
+
+    if not args.zips:
+        parser.error("no ZIPs found, pass --zips")
+
+    work_dir = tempfile.mkdtemp(prefix="bench_upload_")
+    try:
+        games = extract_games(args.zips, work_dir)
+        total_files = sum(len(files) for files in games.values())
+        total_mb = sum(os.path.getsize(p) for files in games.values() for p in files.values()) / 1e6
+        print(f"{len(games)} games, {total_files} files, {total_mb:.1f} MB; "
+              f"latency {args.latency * 1000:.0f} ms, error rate {args.error_rate:.0%}")
+        print()
+        print(f"{'mode':<6} {'workers':>7} {'seconds':>8} {'files/s':>8} {'req/game':>9} "
+              f"{'p50 s':>7} {'p95 s':>7} {'failed':>6} {'retried':>7}")
+
+        modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+        for mode in modes:
+            for workers in [int(w) for w in args.workers.split(",")]:
+                run = run_sync if mode == "sync" else run_async
+                elapsed, times, requests, failed, stats = run(games, workers, args)
+                retried = sum(n for key, n in stats["by_endpoint"].items() if key.endswith("injected_error"))
+                print(f"{mode:<6} {workers:>7} {elapsed:>8.2f} {total_files / elapsed:>8.1f} "
+                      f"{sum(requests) / len(requests):>9.1f} {percentile(times, 50):>7.2f} "
+                      f"{percentile(times, 95):>7.2f} {failed:>6} {retried:>7}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+"""In-memory stand-in for api.github.com
+
+Implements the Contents and Git Data endpoints used by github_utils and
+github_async, so the upload pipeline can be benchmarked reproducibly
+without touching a real repository or spending rate limit.
+
+Run standalone:
+    python -m tools.mock_github --port 8765 --latency 0.05 --error-rate 0.01
+    GITHUB_API_URL=http://127.0.0.1:8765 streamlit run app.py
+
+Or embed it, as tools/bench_upload.py does:
+    server = MockGitHub(latency=0.05).start()
+    print(server.url)
+
+Extra endpoints: GET /_stats returns request counters, POST /_reset
+clears them.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+EMPTY_TREE = {}
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def _sha(kind, data):
+    """Git object SHA of data stored as kind"""
+    return hashlib.sha1(f"{kind} {len(data)}\0".encode() + data).hexdigest()
+
+
+class Repo:
+    """A single-branch git object store
+
+    Trees are kept flattened as {path: blob sha} for every file below
+    them; subtrees are registered on demand so their SHAs can be fetched
+    like any other tree.
+    """
+
+    def __init__(self, branch):
+        self.lock = threading.Lock()
+        self.blobs = {}
+        self.trees = {}
+        self.commits = {}
+        root = self.put_tree(EMPTY_TREE)
+        self.refs = {branch: self.put_commit(root, [], "Initial commit")}
+
+    # -------------------------------------------------
+    # Objects
+    # -------------------------------------------------
+    def put_blob(self, data):
+        sha = _sha("blob", data)
+        self.blobs[sha] = data
+        return sha
+
+    def put_tree(self, files):
+        sha = _sha("tree", json.dumps(sorted(files.items())).encode())
+        self.trees[sha] = dict(files)
+        return sha
+
+    def put_commit(self, tree, parents, message):
+        sha = _sha("commit", json.dumps([tree, parents, message, time.time()]).encode())
+        self.commits[sha] = {"tree": tree, "parents": parents, "message": message}
+        return sha
+
+    def subtree(self, files, prefix):
+        """Files below prefix, relative to it"""
+        prefix = prefix.strip("/")
+        if not prefix:
+            return dict(files)
+        return {path[len(prefix) + 1:]: sha for path, sha in files.items() if path.startswith(prefix + "/")}
+
+    def resolve(self, tree_ish):
+        """Return the flattened tree for a tree SHA, commit SHA, branch or branch:path, or None"""
+        name, _, path = tree_ish.partition(":")
+        if name in self.refs:
+            name = self.commits[self.refs[name]]["tree"]
+        elif name in self.commits:
+            name = self.commits[name]["tree"]
+        files = self.trees.get(name)
+        if files is None:
+            return None
+        if path:
+            files = self.subtree(files, path)
+            return files or None
+        return files
+
+    def entries(self, files, recursive):
+        """Git Trees API entries for a flattened tree"""
+        entries = []
+        seen = set()
+        for path in sorted(files):
+            parts = path.split("/")
+            depth = len(parts) if recursive else 1
+            for i in range(1, min(depth, len(parts) - 1) + 1):
+                folder = "/".join(parts[:i])
+                if folder not in seen:
+                    seen.add(folder)
+                    entries.append({
+                        "path": folder, "mode": "040000", "type": "tree",
+                        "sha": self.put_tree(self.subtree(files, folder))
+                    })
+            if recursive or len(parts) == 1:
+                entries.append({
+                    "path": path, "mode": "100644", "type": "blob",
+                    "sha": files[path], "size": len(self.blobs.get(files[path], b""))
+                })
+        return entries
+
+    def is_ancestor(self, ancestor, commit):
+        while commit:
+            if commit == ancestor:
+                return True
+            parents = self.commits[commit]["parents"]
+            commit = parents[0] if parents else None
+        return False
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockGitHub/1.0"
+    # Headers and body go out in separate writes; with Nagle on, the client's
+    # delayed ACK would add ~40 ms to every keep-alive request
+    disable_nagle_algorithm = True
+
+    ROUTES = [
+        ("GET", r"git/ref/heads/(?P<branch>.+)", "get_ref"),
+        ("PATCH", r"git/refs/heads/(?P<branch>.+)", "update_ref"),
+        ("GET", r"git/commits/(?P<sha>\w+)", "get_commit"),
+        ("POST", r"git/commits", "create_commit"),
+        ("POST", r"git/blobs", "create_blob"),
+        ("GET", r"git/trees/(?P<tree_ish>.+)", "get_tree"),
+        ("POST", r"git/trees", "create_tree"),
+        ("GET", r"contents/?(?P<path>.*)", "get_contents"),
+        ("PUT", r"contents/(?P<path>.+)", "put_contents"),
+        ("DELETE", r"contents/(?P<path>.+)", "delete_contents"),
+    ]
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def do_PATCH(self):
+        self.dispatch("PATCH")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    # -------------------------------------------------
+    # Plumbing
+    # -------------------------------------------------
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            data = b"".join(chunks)
+        else:
+            data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        return json.loads(data) if data else {}
+
+    def reply(self, status, body=None, headers=None):
+        data = json.dumps(body if body is not None else {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def dispatch(self, method):
+        server = self.server
+        url = urlsplit(self.path)
+        self.query = parse_qs(url.query)
+        body = self.read_body() if method in WRITE_METHODS else {}
+
+        if url.path == "/_stats":
+            return self.reply(200, server.stats())
+        if url.path == "/_reset" and method == "POST":
+            server.reset_stats()
+            return self.reply(200, server.stats())
+
+        match = re.match(r"/repos/[^/]+/[^/]+/(.*)$", url.path)
+        if not match:
+            return self.reply(404, {"message": "Not Found"})
+        rest = match.group(1)
+
+        for route_method, pattern, name in self.ROUTES:
+            route = re.fullmatch(pattern, rest)
+            if route_method == method and route:
+                break
+        else:
+            return self.reply(404, {"message": "Not Found"})
+
+        server.count(method, name)
+        if server.latency:
+            time.sleep(server.latency * random.uniform(0.5, 1.5))
+
+        limited = server.check_rate_limit(method)
+        headers = server.rate_limit_headers()
+        if limited:
+            return self.reply(403, {"message": limited[0]}, {**headers, **limited[1]})
+        if server.error_rate and random.random() < server.error_rate:
+            server.count(method, "injected_error")
+            return self.reply(random.choice([500, 502, 503]), {"message": "Injected error"}, headers)
+
+        params = {key: unquote(value) for key, value in route.groupdict().items()}
+        with server.repo.lock:
+            status, result = getattr(self, name)(server.repo, body, **params)
+        self.reply(status, result, headers)
+
+    # -------------------------------------------------
+    # Git Data API
+    # -------------------------------------------------
+    def get_ref(self, repo, body, branch):
+        if branch not in repo.refs:
+            return 404, {"message": "Not Found"}
+        return 200, {"ref": f"refs/heads/{branch}", "object": {"sha": repo.refs[branch], "type": "commit"}}
+
+    def update_ref(self, repo, body, branch):
+        sha = body.get("sha")
+        if branch not in repo.refs or sha not in repo.commits:
+            return 422, {"message": "Reference update failed"}
+        if not body.get("force") and not repo.is_ancestor(repo.refs[branch], sha):
+            return 422, {"message": "Update is not a fast forward"}
+        repo.refs[branch] = sha
+        return 200, {"ref": f"refs/heads/{branch}", "object": {"sha": sha, "type": "commit"}}
+
+    def get_commit(self, repo, body, sha):
+        commit = repo.commits.get(sha)
+        if commit is None:
+            return 404, {"message": "Not Found"}
+        return 200, {
+            "sha": sha,
+            "message": commit["message"],
+            "tree": {"sha": commit["tree"]},
+            "parents": [{"sha": parent} for parent in commit["parents"]]
+        }
+
+    def create_commit(self, repo, body):
+        if body.get("tree") not in repo.trees or any(p not in repo.commits for p in body.get("parents", [])):
+            return 422, {"message": "Invalid tree or parent"}
+        sha = repo.put_commit(body["tree"], body.get("parents", []), body.get("message", ""))
+        return 201, {"sha": sha, "tree": {"sha": body["tree"]}}
+
+    def create_blob(self, repo, body):
+        content = body.get("content", "")
+        data = base64.b64decode(content) if body.get("encoding") == "base64" else content.encode()
+        return 201, {"sha": repo.put_blob(data), "size": len(data)}
+
+    def get_tree(self, repo, body, tree_ish):
+        files = repo.resolve(tree_ish)
+        if files is None:
+            return 404, {"message": "Not Found"}
+        sha = repo.put_tree(files)
+        recursive = self.query.get("recursive", ["0"])[0] not in ("0", "false", "")
+        return 200, {"sha": sha, "tree": repo.entries(files, recursive), "truncated": False}
+
+    def create_tree(self, repo, body):
+        base = body.get("base_tree")
+        if base and base not in repo.trees:
+            return 422, {"message": "Invalid base_tree"}
+        files = dict(repo.trees[base]) if base else {}
+
+        for entry in body.get("tree", []):
+            path, sha = entry["path"], entry.get("sha")
+            if entry.get("type") == "tree" or (sha is None and path not in files):
+                for old in [p for p in files if p.startswith(path + "/")]:
+                    del files[old]
+                if sha is not None:
+                    if sha not in repo.trees:
+                        return 422, {"message": f"Invalid tree {sha}"}
+                    files.update({f"{path}/{p}": s for p, s in repo.trees[sha].items()})
+            elif sha is None:
+                del files[path]
+            else:
+                if sha not in repo.blobs:
+                    return 422, {"message": f"Invalid blob {sha}"}
+                files[path] = sha
+        return 201, {"sha": repo.put_tree(files)}
+
+    # -------------------------------------------------
+    # Contents API
+    # -------------------------------------------------
+    def _head_files(self, repo):
+        return repo.trees[repo.commits[repo.refs[self.server.branch]]["tree"]]
+
+    def _file_info(self, repo, path, sha):
+        return {"name": path.rsplit("/", 1)[-1], "path": path, "sha": sha,
+                "size": len(repo.blobs[sha]), "type": "file"}
+
+    def _commit_files(self, repo, files, message):
+        head = repo.refs[self.server.branch]
+        commit = repo.put_commit(repo.put_tree(files), [head], message)
+        repo.refs[self.server.branch] = commit
+        return {"sha": commit}
+
+    def get_contents(self, repo, body, path):
+        files = self._head_files(repo)
+        path = path.strip("/")
+        if path in files:
+            return 200, self._file_info(repo, path, files[path])
+        below = repo.subtree(files, path)
+        if not below:
+            return 404, {"message": "Not Found"}
+        listing = []
+        for entry in repo.entries(below, recursive=False):
+            full = f"{path}/{entry['path']}" if path else entry["path"]
+            if entry["type"] == "blob":
+                listing.append(self._file_info(repo, full, entry["sha"]))
+            else:
+                listing.append({"name": entry["path"], "path": full, "sha": entry["sha"], "size": 0, "type": "dir"})
+        return 200, listing
+
+    def put_contents(self, repo, body, path):
+        files = dict(self._head_files(repo))
+        current = files.get(path)
+        if current and body.get("sha") != current:
+            if "sha" not in body:
+                return 422, {"message": "\"sha\" wasn't supplied."}
+            return 409, {"message": f"{path} does not match {body['sha']}"}
+        files[path] = repo.put_blob(base64.b64decode(body.get("content", "")))
+        commit = self._commit_files(repo, files, body.get("message", ""))
+        return (200 if current else 201), {"content": self._file_info(repo, path, files[path]), "commit": commit}
+
+    def delete_contents(self, repo, body, path):
+        files = dict(self._head_files(repo))
+        current = files.get(path)
+        if current is None:
+            return 404, {"message": "Not Found"}
+        if body.get("sha") != current:
+            return 409, {"message": f"{path} does not match {body.get('sha')}"}
+        del files[path]
+        return 200, {"content": None, "commit": self._commit_files(repo, files, body.get("message", ""))}
+
+
+class MockGitHub(ThreadingHTTPServer):
+    """Threaded mock server with latency, rate limits and error injection
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        branch: Branch that exists initially
+        latency: Mean seconds added to every API request (+/- 50% jitter)
+        rate_limit: Core requests allowed per window; 0 disables the limit
+        window: Seconds until the core limit resets
+        write_rate: Writes allowed per second before a secondary limit; 0 disables it
+        error_rate: Fraction of requests answered with a random 5xx
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, branch="main", latency=0.0, rate_limit=0, window=3600,
+                 write_rate=0, error_rate=0.0, verbose=False):
+        super().__init__(("127.0.0.1", port), MockHandler)
+        self.branch = branch
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.window = window
+        self.write_rate = write_rate
+        self.error_rate = error_rate
+        self.verbose = verbose
+        self.repo = Repo(branch)
+        self._lock = threading.Lock()
+        self._writes = []
+        self.reset_stats()
+        self._window_start = time.time()
+        self._used = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        """Serve on a background thread and return self"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, method, name):
+        with self._lock:
+            self._counts[f"{method} {name}"] += 1
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "requests": sum(n for key, n in counts.items() if not key.endswith("injected_error")),
+            "by_endpoint": counts
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._counts = Counter()
+
+    def check_rate_limit(self, method):
+        """Consume rate limit for one request
+
+        Returns:
+            tuple: (message, extra headers) if the request is rejected, else None
+        """
+        now = time.time()
+        with self._lock:
+            if now - self._window_start >= self.window:
+                self._window_start, self._used = now, 0
+            if self.rate_limit:
+                if self._used >= self.rate_limit:
+                    return "API rate limit exceeded", {}
+                self._used += 1
+            if self.write_rate and method in WRITE_METHODS:
+                self._writes = [t for t in self._writes if now - t < 1.0]
+                if len(self._writes) >= self.write_rate:
+                    return "You have exceeded a secondary rate limit", {"Retry-After": 1}
+                self._writes.append(now)
+        return None
+
+    def rate_limit_headers(self):
+        if not self.rate_limit:
+            return {}
+        with self._lock:
+            return {
+                "X-RateLimit-Limit": self.rate_limit,
+                "X-RateLimit-Remaining": max(0, self.rate_limit - self._used),
+                "X-RateLimit-Reset": int(self._window_start + self.window)
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock GitHub API server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--branch", default="main")
+    parser.add_argument("--latency", type=float, default=0.0, help="mean seconds per request")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per window, 0 = unlimited")
+    parser.add_argument("--window", type=int, default=3600, help="rate limit window in seconds")
+    parser.add_argument("--write-rate", type=int, default=0, help="writes per second, 0 = unlimited")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 5xx")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = MockGitHub(args.port, args.branch, args.latency, args.rate_limit, args.window,
+                        args.write_rate, args.error_rate, args.verbose)
+    print(f"Mock GitHub API on {server.url} (branch {args.branch})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
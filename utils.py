@@ -1,3 +1,10 @@
+import hashlib
+import os
+
+# Bytes read at a time when hashing local files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
 def slugify(text: str) -> str:
     return (
         text.strip()
@@ -5,4 +12,26 @@ def slugify(text: str) -> str:
         .replace(" ", "_")
         .replace("/", "_")
     )
- 
\ No newline at end of file
+
+
+def collect_files(folder: str) -> dict:
+    """Map every file under folder to its path relative to folder (forward slashes)"""
+    files = {}
+    for root, _, names in os.walk(folder):
+        for name in names:
+            full = os.path.join(root, name)
+            files[os.path.relpath(full, folder).replace("\\", "/")] = full
+    return files
+
+
+def git_blob_sha(local_path):
+    """Compute the git blob SHA of a local file without loading it whole
+
+    Git hashes sha1(b"blob <size>\\0" + content), so a matching value means
+    GitHub already stores exactly these bytes.
+    """
+    digest = hashlib.sha1(f"blob {os.path.getsize(local_path)}\0".encode())
+    with open(local_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()